@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+from latency_metrics import LatencyTracker
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Tiers in the order they are tried, cheapest first
+TIER_NAMES = ('cache', 'tfidf', 'dense', 'llm')
+
+DEFAULT_POLICY = {
+    'top_k': 3,
+    'context_threshold': 0.2,
+    'deadline_ms': None,
+    'tiers': [
+        {'name': 'cache', 'budget_ms': 5},
+        {'name': 'tfidf', 'min_confidence': 0.3, 'budget_ms': 50},
+        {'name': 'dense', 'min_confidence': 0.75, 'budget_ms': 100},
+        {'name': 'llm', 'budget_ms': 30000},
+    ],
+}
+
+@dataclass
+class TierPolicy:
+    """Routing settings for one answer tier."""
+
+    name: str
+    enabled: bool = True
+    min_confidence: float = 0.0
+    budget_ms: Optional[float] = None
+
+@dataclass
+class RoutingPolicy:
+    """Declarative description of which tiers run, in what order, and how strictly."""
+
+    tiers: list
+    top_k: int = 3
+    context_threshold: float = 0.2
+    deadline_ms: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, config):
+        """Build a policy from a plain dict, e.g. parsed JSON."""
+        tiers = [TierPolicy(**tier) for tier in config.get('tiers', DEFAULT_POLICY['tiers'])]
+        for tier in tiers:
+            if tier.name not in TIER_NAMES:
+                raise ValueError(f"Unknown answer tier: {tier.name}")
+        if not tiers or tiers[-1].name != 'llm' or not tiers[-1].enabled:
+            raise ValueError("The routing policy must end with an enabled 'llm' tier")
+        return cls(
+            tiers=tiers,
+            top_k=config.get('top_k', DEFAULT_POLICY['top_k']),
+            context_threshold=config.get('context_threshold', DEFAULT_POLICY['context_threshold']),
+            deadline_ms=config.get('deadline_ms', DEFAULT_POLICY['deadline_ms'])
+        )
+
+    def tier(self, name):
+        """Return the enabled policy for a tier, or None if it is switched off."""
+        for tier in self.tiers:
+            if tier.name == name and tier.enabled:
+                return tier
+        return None
+
+def load_policy(source=None):
+    """Load a routing policy from a JSON string or file path, defaulting to ROUTER_POLICY."""
+    source = source if source is not None else os.environ.get('ROUTER_POLICY')
+    if not source:
+        return RoutingPolicy.from_dict(DEFAULT_POLICY)
+    if os.path.exists(source):
+        with open(source, 'r') as f:
+            return RoutingPolicy.from_dict(json.load(f))
+    return RoutingPolicy.from_dict(json.loads(source))
+
+@dataclass
+class RouteDecision:
+    """Which tier answered a message, with its confidence and timings."""
+
+    text: str
+    category: Optional[str] = None
+    answer: object = None
+    source: Optional[str] = None
+    tier: Optional[str] = None
+    confidence: float = 0.0
+    retrieval: object = None
+    cache_key: Optional[tuple] = None
+    generation: Optional[str] = None
+    tier_ms: dict = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed_ms(self):
+        """Milliseconds since routing started."""
+        return (time.perf_counter() - self.started) * 1000
+
+    @property
+    def answered(self):
+        """Whether some tier has produced the answer."""
+        return self.tier is not None
+
+class AnswerRouter:
+    """Runs answer tiers from cheapest to most expensive until one is confident.
+
+    The exact-match response cache, the TF-IDF direct answer and the dense
+    direct answer are local; the LLM tier is only reached when none of them
+    clears its confidence threshold. Every decision is counted per tier so
+    the LLM call rate can be tuned from the policy alone.
+    """
+
+    def __init__(self, service, policy=None):
+        """Route for a ChatbotService using the given or configured policy."""
+        self.service = service
+        self.policy = policy or load_policy()
+        self.latency = LatencyTracker()
+        self._answered = {name: 0 for name in TIER_NAMES}
+        self._over_budget = {name: 0 for name in TIER_NAMES}
+        self._errors = 0
+        self._fallbacks = 0
+        self._lock = threading.Lock()
+
+    def _timed(self, decision, tier, func, *args):
+        """Run one tier, recording its latency and any budget overrun."""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            decision.tier_ms[tier.name] = elapsed_ms
+            self.latency.record(f'tier_{tier.name}', elapsed_ms)
+            if tier.budget_ms is not None and elapsed_ms > tier.budget_ms:
+                with self._lock:
+                    self._over_budget[tier.name] += 1
+                logger.warning(f"Tier {tier.name} took {elapsed_ms:.1f} ms, over its {tier.budget_ms} ms budget")
+
+    def _within_deadline(self, decision, tier):
+        """Whether an optional tier still fits in the request deadline."""
+        if self.policy.deadline_ms is None or tier.budget_ms is None:
+            return True
+        return decision.elapsed_ms + tier.budget_ms <= self.policy.deadline_ms
+
+    def _cache_tier(self, decision, tier):
+        """Look the normalized message up in the exact response cache."""
+        decision.cache_key, decision.generation = self.service.response_cache_key(decision.text, decision.category)
+        cached = self.service.response_cache.get(decision.cache_key, decision.generation)
+        if cached is not None:
+            decision.answer, decision.source = cached
+            decision.confidence = 1.0
+            return True
+        return False
+
+    def _tfidf_tier(self, decision, tier):
+        """Answer directly from the best retrieved FAQ when it scores high enough."""
+        retrieval = self._ensure_retrieval(decision, threshold=tier.min_confidence)
+        if retrieval.best_match is not None:
+            decision.answer = retrieval.best_match['answer']
+            decision.source = 'nltk'
+            decision.confidence = float(retrieval.best_score)
+            return True
+        decision.confidence = float(retrieval.best_score)
+        return False
+
+    def _dense_tier(self, decision, tier):
+        """Answer directly from the nearest FAQ in embedding space."""
+        snapshot = self.service.nltk_processor.snapshot
+        dense_index = snapshot.dense_index
+        if dense_index is None:
+            return False
+        
+        embedding = dense_index.encode([decision.text])
+        partition = snapshot.partition(decision.category) if decision.category else None
+        if partition is not None:
+            # Only the selected category's FAQs are eligible
+            scores = dense_index.score_matrix(embedding, 1, partition.rows)[0]
+            if len(scores) == 0:
+                return False
+            best = int(scores.argmax())
+            row, score = int(partition.rows[best]), float(scores[best])
+        else:
+            indices, scores = dense_index.search(embedding, 1)
+            if indices.shape[1] == 0 or indices[0, 0] < 0:
+                return False
+            row, score = int(indices[0, 0]), float(scores[0, 0])
+        
+        if score >= tier.min_confidence:
+            decision.answer = snapshot.faqs[row]['answer']
+            decision.source = 'dense'
+            decision.confidence = score
+            return True
+        return False
+
+    def _ensure_retrieval(self, decision, threshold=float('inf')):
+        """Score the message once and keep the result for later tiers."""
+        if decision.retrieval is None:
+            decision.retrieval = self.service.nltk_processor.retrieve(
+                decision.text,
+                top_k=self.policy.top_k,
+                threshold=threshold,
+                context_threshold=self.policy.context_threshold,
+                category=decision.category
+            )
+        return decision.retrieval
+
+    def answer_locally(self, text, category=None):
+        """Run every tier before the LLM, stopping at the first confident one.
+
+        The returned decision has answered set when a local tier answered;
+        otherwise it carries the retrieval the LLM tier should use.
+        """
+        decision = RouteDecision(text=text, category=category)
+        handlers = {'cache': self._cache_tier, 'tfidf': self._tfidf_tier, 'dense': self._dense_tier}
+
+        for tier in self.policy.tiers:
+            if not tier.enabled or tier.name == 'llm':
+                continue
+            if not self._within_deadline(decision, tier):
+                logger.debug(f"Skipping tier {tier.name}, request deadline nearly spent")
+                continue
+            try:
+                if self._timed(decision, tier, handlers[tier.name], decision, tier):
+                    decision.tier = tier.name
+                    break
+            except Exception as e:
+                logger.error(f"Error in answer tier {tier.name}: {e}")
+
+        if not decision.answered:
+            # The LLM still needs the top FAQs as context
+            self._ensure_retrieval(decision)
+        return decision
+
+    def llm_timeout(self, decision=None):
+        """Seconds the LLM tier may take, or None.
+        
+        This is the tier budget, cut to what is left of the request deadline
+        when a decision is given.
+        """
+        tier = self.policy.tier('llm')
+        budgets = []
+        if tier is not None and tier.budget_ms is not None:
+            budgets.append(tier.budget_ms)
+        if decision is not None and self.policy.deadline_ms is not None:
+            budgets.append(max(0.0, self.policy.deadline_ms - decision.elapsed_ms))
+        return min(budgets) / 1000.0 if budgets else None
+
+    def finish(self, decision, answer=None, source=None):
+        """Record the answering tier and cache the answer if it is worth replaying."""
+        if answer is not None:
+            decision.answer, decision.source = answer, source
+            decision.tier = 'llm'
+
+        with self._lock:
+            if decision.source == 'error':
+                self._errors += 1
+            elif decision.source == 'fallback':
+                self._fallbacks += 1
+            elif decision.tier is not None:
+                self._answered[decision.tier] += 1
+        self.latency.record('route_total', decision.elapsed_ms)
+
+        # Never cache failures or stand-in answers, and cache hits are already cached
+        if decision.tier not in (None, 'cache') and decision.source not in ('error', 'busy', 'fallback'):
+            self.service.response_cache.put(decision.cache_key, (decision.answer, decision.source), decision.generation)
+        logger.debug(f"Answered by tier {decision.tier} in {decision.elapsed_ms:.1f} ms")
+        return decision
+
+    def route(self, text, category=None):
+        """Answer a message from the cheapest confident tier, calling the LLM last."""
+        decision = self.answer_locally(text, category)
+        if decision.answered:
+            return self.finish(decision)
+
+        tier = self.policy.tier('llm')
+        answer, source = self._timed(
+            decision, tier,
+            lambda: self.service.get_rag_response(text, retrieval=decision.retrieval, timeout=self.llm_timeout(decision))
+        )
+        return self.finish(decision, answer, source)
+
+    def stats(self):
+        """Return how many requests each tier answered and the resulting LLM call rate."""
+        with self._lock:
+            answered = dict(self._answered)
+            over_budget = dict(self._over_budget)
+            errors = self._errors
+            fallbacks = self._fallbacks
+        total = sum(answered.values()) + errors + fallbacks
+        return {
+            'answered': answered,
+            'over_budget': over_budget,
+            'errors': errors,
+            # LLM requests answered with the best FAQ because the LLM failed or ran out of time
+            'fallbacks': fallbacks,
+            'total': total,
+            'llm_rate': answered['llm'] / total if total else 0.0,
+            'latency': self.latency.summary(),
+            # Size of what the LLM tier sends, which drives its latency and cost
+            'prompt': self.service.prompt_builder.stats(),
+            'single_flight': self.service.single_flight.stats(),
+            'llm': self.service.llm_caller.stats(),
+        }
@@ -0,0 +1,111 @@
+import os
+import logging
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+from service_registry import registry, get_chatbot_service, reload_faqs
+from latency_metrics import startup_profile
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Initialize Flask app
+app = Flask(__name__)
+app.secret_key = os.environ.get("SESSION_SECRET", "fallback_secret_key")
+
+# Pick up edits to faqs.json without a restart; 0 disables polling
+FAQ_WATCH_INTERVAL = float(os.environ.get('FAQ_WATCH_INTERVAL', '5'))
+registry.start_watcher(FAQ_WATCH_INTERVAL)
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the worker process is up and serving requests."""
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: the FAQ index is loaded, so requests are answered without a cold build."""
+    service = registry.loaded()
+    if service is None:
+        return jsonify({'ready': False, 'pid': os.getpid()}), 503
+    snapshot = service.nltk_processor.snapshot
+    return jsonify({
+        'ready': True,
+        'pid': os.getpid(),
+        'faqs': len(snapshot.faqs),
+        'generation': snapshot.generation,
+        'startup': startup_profile.report(),
+    })
+
+@app.route('/')
+def index():
+    """Render the chat interface."""
+    return render_template('index.html', categories=get_chatbot_service().get_categories())
+
+@app.route('/api/categories')
+def categories():
+    """Get all available FAQ categories."""
+    return jsonify({'categories': get_chatbot_service().get_categories()})
+
+@app.route('/api/category_questions')
+def category_questions():
+    """Get the FAQ questions for one category."""
+    category = request.args.get('category', '')
+    return jsonify({'questions': get_chatbot_service().get_questions_by_category(category)})
+
+@app.route('/api/chat', methods=['POST'])
+def chat():
+    """Answer a message in one JSON response."""
+    try:
+        data = request.get_json(silent=True) or {}
+        message = data.get('message', '')
+        if not message.strip():
+            return jsonify({'error': 'No message provided'}), 400
+
+        decision = get_chatbot_service().route(message, data.get('category'))
+        return jsonify({'response': decision.answer, 'source': decision.source, 'tier': decision.tier})
+    except Exception as e:
+        logger.error(f"Error processing chat message: {e}")
+        return jsonify({'error': 'Failed to process message'}), 500
+
+@app.route('/api/router/stats')
+def router_stats():
+    """Report which answer tiers have been answering, including the LLM call rate."""
+    return jsonify(get_chatbot_service().router.stats())
+
+@app.route('/api/startup')
+def startup_report():
+    """Report how long this worker took to become ready, by startup phase."""
+    return jsonify(startup_profile.report())
+
+@app.route('/api/admin/reload', methods=['POST'])
+def admin_reload():
+    """Apply the diff of faqs.json to the running service."""
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if admin_token and request.headers.get('X-Admin-Token') != admin_token:
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        diff = reload_faqs()
+        return jsonify({'changes': diff.summary()})
+    except Exception as e:
+        logger.error(f"Error reloading FAQs: {e}")
+        return jsonify({'error': 'Failed to reload FAQs'}), 500
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Answer a message as a plain-text stream, flushing chunks as they arrive."""
+    try:
+        data = request.get_json(silent=True) or {}
+        message = data.get('message', '')
+        if not message.strip():
+            return jsonify({'error': 'No message provided'}), 400
+
+        chunks, source = get_chatbot_service().stream_chat(message, data.get('category'))
+        response = Response(stream_with_context(chunks), mimetype='text/plain')
+        response.headers['X-Response-Source'] = source
+        # Keep reverse proxies from buffering the stream
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        logger.error(f"Error streaming chat message: {e}")
+        return jsonify({'error': 'Failed to process message'}), 500
@@ -1,9 +1,10 @@
 import os
 import streamlit as st
-from chatbot_service import ChatbotService
+from service_registry import registry
 
-# Initialize chatbot service
-chatbot_service = ChatbotService()
+# Reuse the process-wide chatbot service across reruns and sessions,
+# applying only the FAQs that changed if faqs.json was edited on disk
+chatbot_service = registry.refresh_if_changed()
 
 # Streamlit UI
 st.title("Aurora Support Chatbot")
@@ -20,8 +21,9 @@ if st.button("Send"):
         st.warning("Please enter a message.")
     else:
         try:
-            # Get response from the chatbot
-            response = chatbot_service.chat(user_message, selected_category)
-            st.markdown(f"**Bot:** {response}")
+            # Stream the response so the first tokens render while the rest is generated
+            chunks, source = chatbot_service.stream_chat(user_message, selected_category)
+            st.markdown("**Bot:**")
+            st.write_stream(chunks)
         except Exception as e:
             st.error(f"Error: {str(e)}")
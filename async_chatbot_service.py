@@ -0,0 +1,314 @@
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from openai import AsyncOpenAI
+from single_flight import AsyncSingleFlight
+from resilience import ResilientCaller, Deadline
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '64'))
+DEFAULT_MAX_PENDING = int(os.environ.get('LLM_MAX_PENDING', '512'))
+DEFAULT_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS', '100'))
+
+BUSY_MESSAGE = "The Matrix is a little crowded right now. Please try your question again in a moment."
+
+async def _single_chunk(text):
+    """Wrap a complete answer as a one-chunk async stream."""
+    yield text
+
+async def _prepend(first, chunks):
+    """Yield an already received chunk, then the rest of an async stream."""
+    try:
+        yield first
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        await chunks.aclose()
+
+class AsyncChatbotService:
+    """Asyncio front end for ChatbotService with non-blocking LLM calls.
+
+    Retrieval stays on the wrapped synchronous service but runs in a thread
+    pool, while completions go through a pooled AsyncOpenAI client. At most
+    max_concurrency completions are in flight; once max_pending requests are
+    waiting, new ones are shed immediately with a busy reply.
+    """
+
+    def __init__(self, service=None, max_concurrency=DEFAULT_MAX_CONCURRENCY, max_pending=DEFAULT_MAX_PENDING,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, base_url=None, executor=None):
+        """Wrap a ChatbotService and create the pooled async completion client."""
+        try:
+            if service is None:
+                from service_registry import get_chatbot_service
+                service = get_chatbot_service()
+            self.service = service
+
+            # Reuse keep-alive connections across completions instead of reconnecting
+            self.http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections
+                ),
+                timeout=httpx.Timeout(60.0, connect=5.0)
+            )
+            self.openai_client = AsyncOpenAI(
+                api_key=os.environ.get("OPENAI_API_KEY"),
+                base_url=base_url or os.environ.get("OPENAI_BASE_URL"),
+                http_client=self.http_client,
+                max_retries=0
+            )
+
+            # Same breaker as the sync path, so both stop calling a failing provider together
+            self.llm_caller = ResilientCaller(breaker=service.llm_caller.breaker)
+
+            # CPU-bound TF-IDF scoring runs here so it never blocks the event loop
+            self.executor = executor or ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 4,
+                thread_name_prefix='retrieval'
+            )
+
+            self.max_concurrency = max_concurrency
+            self.max_pending = max_pending
+            self.pending = 0
+            self.rejected = 0
+            self.single_flight = AsyncSingleFlight()
+            self._semaphore = asyncio.Semaphore(max_concurrency)
+
+            logger.info("AsyncChatbotService initialized successfully")
+        except Exception as e:
+            logger.error(f"Error initializing AsyncChatbotService: {e}")
+            raise
+
+    async def _run_in_executor(self, func, *args):
+        """Run a blocking callable on the retrieval thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def retrieve(self, text, top_k=3, category=None):
+        """Score a query against the FAQ corpus, or one category of it, off the event loop."""
+        return await self._run_in_executor(self.service.retrieve, text, top_k, category)
+
+    async def get_nltk_response(self, text, retrieval=None, category=None):
+        """Get response using NLTK-based FAQ matching."""
+        if retrieval is None:
+            retrieval = await self.retrieve(text, category=category)
+        return self.service.get_nltk_response(text, retrieval=retrieval)
+
+    async def get_rag_response(self, text, retrieval=None, timeout=None, category=None):
+        """Get response using RAG approach with a non-blocking completion call.
+
+        timeout defaults to the LLM tier budget of the routing policy.
+        """
+        # Shed load once the wait queue is full rather than queueing without bound
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"Rejecting RAG request, {self.pending} already pending")
+            return BUSY_MESSAGE, "busy"
+
+        self.pending += 1
+        try:
+            if retrieval is None:
+                retrieval = await self.retrieve(text, top_k=3, category=category)
+
+            generation = self.service.nltk_processor.tfidf_index.content_hash
+            cached_answer = self.service.semantic_cache.get(retrieval.top_ids, retrieval.query_vector, generation,
+                                                            retrieval.unknown_terms)
+            if cached_answer is not None:
+                logger.info("Answered RAG query from semantic cache")
+                return cached_answer, "rag"
+
+            request = self.service.build_rag_request(text, retrieval.top_matches)
+            if timeout is None:
+                timeout = self.service.router.llm_timeout()
+
+            async def attempt(remaining):
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    response = await self.openai_client.chat.completions.create(**request, timeout=remaining)
+                    self.service.latency.record('rag_total', (time.perf_counter() - start) * 1000)
+                return response.choices[0].message.content
+
+            async def complete():
+                answer = await self.llm_caller.call_async(attempt, timeout)
+                logger.info("Generated RAG response using async OpenAI client")
+                self.service.semantic_cache.put(retrieval.top_ids, retrieval.query_vector, answer, generation,
+                                                retrieval.unknown_terms)
+                return answer
+
+            # Concurrent identical prompts wait on one completion instead of each taking a slot
+            answer = await self.single_flight.do(self.service.rag_flight_key(request), complete)
+            return answer, "rag"
+        except Exception as e:
+            logger.error(f"Error generating async RAG response: {e}")
+            return self.service.lexical_fallback(retrieval)
+        finally:
+            self.pending -= 1
+
+    async def stream_rag_response(self, text, retrieval=None, on_complete=None, timeout=None, category=None):
+        """Yield a RAG answer in chunks as the completion is generated.
+
+        on_complete is called with the answer and its source as in
+        ChatbotService.stream_rag_response. timeout, defaulting to the LLM
+        tier budget, bounds the whole stream.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"Rejecting streamed RAG request, {self.pending} already pending")
+            if on_complete:
+                on_complete(BUSY_MESSAGE, "busy")
+            yield BUSY_MESSAGE
+            return
+
+        self.pending += 1
+        chunks = []
+        # Set once the LLM is actually called, and cleared once its outcome
+        # reaches the breaker
+        breaker = None
+        try:
+            if retrieval is None:
+                retrieval = await self.retrieve(text, top_k=3, category=category)
+
+            generation = self.service.nltk_processor.tfidf_index.content_hash
+            cached_answer = self.service.semantic_cache.get(retrieval.top_ids, retrieval.query_vector, generation,
+                                                            retrieval.unknown_terms)
+            if cached_answer is not None:
+                yield cached_answer
+                if on_complete:
+                    on_complete(cached_answer, "rag")
+                return
+
+            if not self.llm_caller.breaker.allow():
+                logger.warning("LLM circuit breaker is open, streaming the lexical fallback")
+                answer, source = self.service.lexical_fallback(retrieval)
+                if on_complete:
+                    on_complete(answer, source)
+                yield answer
+                return
+            breaker = self.llm_caller.breaker
+
+            request = self.service.build_rag_request(text, retrieval.top_matches)
+            if timeout is None:
+                timeout = self.service.router.llm_timeout()
+            if timeout is not None:
+                request['timeout'] = timeout
+            # Each await gets what is left of one deadline, so a slowly
+            # trickling stream cannot outlive it as a per-read timeout would
+            deadline = Deadline(timeout)
+            async with self._semaphore:
+                start = time.perf_counter()
+                stream = await asyncio.wait_for(
+                    self.openai_client.chat.completions.create(stream=True, **request), deadline.remaining())
+                try:
+                    chunk_iterator = aiter(stream)
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(anext(chunk_iterator), deadline.remaining())
+                        except StopAsyncIteration:
+                            break
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if not delta:
+                            continue
+                        if not chunks:
+                            self.service.latency.record('rag_first_token', (time.perf_counter() - start) * 1000)
+                        chunks.append(delta)
+                        yield delta
+                finally:
+                    await stream.close()
+                self.service.latency.record('rag_stream_total', (time.perf_counter() - start) * 1000)
+            breaker.record_success()
+            breaker = None
+
+            answer = "".join(chunks)
+            self.service.semantic_cache.put(retrieval.top_ids, retrieval.query_vector, answer, generation,
+                                            retrieval.unknown_terms)
+            if on_complete:
+                on_complete(answer, "rag")
+        except Exception as e:
+            logger.error(f"Error streaming async RAG response: {e}")
+            if breaker is not None:
+                breaker.record_failure()
+                breaker = None
+            if chunks:
+                if on_complete:
+                    on_complete("".join(chunks), "error")
+            else:
+                answer, source = self.service.lexical_fallback(retrieval)
+                if on_complete:
+                    on_complete(answer, source)
+                yield answer
+        finally:
+            # A cancelled or abandoned stream left no outcome; free the
+            # breaker's probe slot in case this call was the probe
+            if breaker is not None:
+                breaker.release()
+            self.pending -= 1
+
+    async def route(self, text, category=None):
+        """Answer a user message through the tiered router, returning its RouteDecision."""
+        router = self.service.router
+        # The local tiers are CPU-bound, so run them off the event loop
+        decision = await self._run_in_executor(router.answer_locally, text, category)
+        if decision.answered:
+            return router.finish(decision)
+
+        start = time.perf_counter()
+        answer, source = await self.get_rag_response(text, retrieval=decision.retrieval,
+                                                      timeout=router.llm_timeout(decision))
+        decision.tier_ms['llm'] = (time.perf_counter() - start) * 1000
+        return router.finish(decision, answer, source)
+
+    async def respond(self, text, category=None):
+        """Answer a user message, returning (answer, source)."""
+        decision = await self.route(text, category)
+        return decision.answer, decision.source
+
+    async def chat(self, text, category=None):
+        """Answer a user message, falling back from the NLTK match to RAG."""
+        return (await self.respond(text, category))[0]
+
+    async def stream_chat(self, text, category=None):
+        """Answer a user message incrementally, returning (async chunk iterator, source).
+
+        As with ChatbotService.stream_chat, the first chunk is produced
+        before returning so a fallback is reported as the source.
+        """
+        router = self.service.router
+        decision = await self._run_in_executor(router.answer_locally, text, category)
+        if decision.answered:
+            router.finish(decision)
+            return _single_chunk(decision.answer), decision.source
+
+        def finish(answer, source):
+            router.finish(decision, answer, source)
+
+        chunks = self.stream_rag_response(text, retrieval=decision.retrieval, on_complete=finish,
+                                          timeout=router.llm_timeout(decision))
+        first = await anext(chunks, None)
+        if first is None:
+            return chunks, 'rag'
+        return _prepend(first, chunks), decision.source or 'rag'
+
+    def stats(self):
+        """Return current load and shedding counters."""
+        return {
+            'pending': self.pending,
+            'rejected': self.rejected,
+            'max_concurrency': self.max_concurrency,
+            'max_pending': self.max_pending,
+            'single_flight': self.single_flight.stats(),
+            'llm': self.llm_caller.stats(),
+        }
+
+    async def aclose(self):
+        """Close pooled connections and stop the retrieval thread pool."""
+        await self.openai_client.close()
+        await self.http_client.aclose()
+        self.executor.shutdown(wait=False)
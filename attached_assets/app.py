@@ -3,23 +3,61 @@ import logging
 import json
 from flask import Flask, render_template, request, jsonify
 from chatbot_model import Chatbot
+from faq_matcher import FaqMatcher
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# The /ask RAG prompt carries at most this many FAQs, within about this many tokens
+ASK_CONTEXT_FAQS = int(os.environ.get('ASK_CONTEXT_FAQS', '5'))
+ASK_CONTEXT_TOKENS = int(os.environ.get('ASK_CONTEXT_TOKENS', '600'))
+
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "fallback_secret_key")
 
-# Initialize the chatbot
+# Initialize the chatbot and compile the keyword matcher once
 try:
     chatbot = Chatbot()
+    faqs = chatbot.faqs
+    openai_client = chatbot.openai_client
+    matcher = FaqMatcher(faqs)
     logger.info("Chatbot initialized successfully")
 except Exception as e:
     logger.error(f"Error initializing chatbot: {e}")
     chatbot = None
 
+def format_context_faq(faq):
+    """Format one FAQ for the /ask RAG prompt."""
+    return f"Category: {faq['category']}\nQ: {faq['question']}\nA: {faq['answer']}"
+
+def estimate_tokens(text):
+    """Estimate prompt tokens at about one per 4 characters."""
+    return (len(text) + 3) // 4
+
+def select_context_faqs(message, likely_categories):
+    """Return the most relevant FAQs for a message that fit the /ask context budget.
+    
+    FAQs are ranked by the local classifier, with those in keyword-detected
+    categories first, and taken in order while they fit.
+    """
+    ranked, _ = chatbot.classifier.rank(message, top_k=len(faqs))
+    if likely_categories:
+        # A stable sort keeps the classifier's order within each group
+        ranked.sort(key=lambda faq: faq['category'] not in likely_categories)
+    
+    selected, remaining = [], ASK_CONTEXT_TOKENS
+    for faq in ranked:
+        cost = estimate_tokens(format_context_faq(faq))
+        if cost > remaining:
+            continue
+        selected.append(faq)
+        remaining -= cost
+        if len(selected) == ASK_CONTEXT_FAQS:
+            break
+    return selected
+
 @app.route('/')
 def index():
     """Render the chat interface."""
@@ -35,63 +73,8 @@ def ask():
         if not message:
             return jsonify({'error': 'No message provided'}), 400
         
-        # Find relevant FAQs with improved matching
-        relevant_faqs = []
-        
-        # First, try to match by exact category
-        if message.lower().startswith("tell me about "):
-            category = message.lower().replace("tell me about ", "").strip()
-            for faq in faqs:
-                if faq['category'].lower() == category:
-                    relevant_faqs.append((faq, 2))  # Higher score for category match
-        
-        # Then try to match by keywords with scoring
-        message_words = set(message.lower().split())
-        for faq in faqs:
-            # Count how many words match
-            question_words = set(faq['question'].lower().split())
-            category_words = set(faq['category'].lower().split())
-            
-            # Calculate score based on matching words
-            word_matches = len(message_words.intersection(question_words))
-            category_matches = len(message_words.intersection(category_words))
-            
-            # Base score from word matches
-            score = word_matches * 2  # Give more weight to question matches
-            
-            # Add score from category matches with special emphasis
-            if category_matches > 0:
-                # Add extra points for category matches
-                score += category_matches * 3
-                
-                # Special emphasis on payment-related matches
-                if faq['category'] == 'Payments':
-                    # Significant boost for payment-related questions
-                    payment_keywords = ['payment', 'payments', 'pay', 'paid', 'card', 'credit', 'debit', 
-                                      'visa', 'mastercard', 'paypal', 'apple pay', 'google pay',
-                                      'method', 'methods', 'charge', 'billing', 'installment',
-                                      'rupee', 'rupees', 'inr', '₹', 'upi', 'paytm', 'phonepe', 'gpay',
-                                      'bhim', 'net banking', 'emi', 'hdfc', 'icici', 'sbi', 'axis',
-                                      'rupay', 'gst', 'india', 'indian']
-                    
-                    # Check if message contains any payment keywords
-                    if any(keyword in message.lower() for keyword in payment_keywords):
-                        score += 8  # Very high boost for payment questions
-                        
-                    # Extra boost for exact question matches
-                    if "what payment methods" in message.lower() and "payment methods" in faq['question'].lower():
-                        score += 10  # Maximum priority for exact payment methods question
-                        
-                    # Special case for Indian payment methods
-                    if any(term in message.lower() for term in ['india', 'indian', 'rupee', 'rupees', 'inr', '₹', 'upi']) and "indian" in faq['question'].lower():
-                        score += 15  # Absolute highest priority for Indian payment method questions
-                
-            # Add to relevant FAQs if score is positive
-            if score > 0:
-                relevant_faqs.append((faq, score))
-        
-        # Sort by score (highest first)
-        relevant_faqs.sort(key=lambda x: x[1], reverse=True)
+        # Score FAQs by shared words plus the category boost table
+        relevant_faqs = matcher.match(message)
         
         # If we found relevant FAQs directly
         if relevant_faqs:
@@ -104,82 +87,13 @@ def ask():
         
         # Otherwise use OpenAI to generate a response
         try:
-            # Select relevant FAQs for context based on query
-            filtered_faqs = []
-            
-            # Try to identify the category
-            category_keywords = {
-                'product': 'Products',
-                'products': 'Products',
-                'item': 'Products',
-                'items': 'Products',
-                'shipping': 'Shipping',
-                'delivery': 'Shipping',
-                'ship': 'Shipping',
-                'return': 'Returns',
-                'refund': 'Returns',
-                'exchange': 'Returns',
-                'payment': 'Payments',
-                'payments': 'Payments',
-                'pay': 'Payments',
-                'paid': 'Payments',
-                'card': 'Payments',
-                'credit': 'Payments',
-                'debit': 'Payments',
-                'paypal': 'Payments',
-                'method': 'Payments',
-                'methods': 'Payments',
-                'visa': 'Payments',
-                'mastercard': 'Payments',
-                'billing': 'Payments',
-                'rupee': 'Payments',
-                'rupees': 'Payments',
-                'inr': 'Payments',
-                '₹': 'Payments',
-                'upi': 'Payments',
-                'paytm': 'Payments',
-                'phonepe': 'Payments',
-                'gpay': 'Payments',
-                'bhim': 'Payments',
-                'netbanking': 'Payments',
-                'emi': 'Payments',
-                'hdfc': 'Payments',
-                'icici': 'Payments',
-                'sbi': 'Payments',
-                'axis': 'Payments',
-                'rupay': 'Payments',
-                'gst': 'Payments',
-                'india': 'Payments',
-                'indian': 'Payments',
-                'account': 'Account',
-                'login': 'Account',
-                'profile': 'Account'
-            }
-            
             # Determine likely categories
-            likely_categories = set()
-            for word in message.lower().split():
-                if word in category_keywords:
-                    likely_categories.add(category_keywords[word])
+            likely_categories = matcher.likely_categories(message)
             
-            # If we've identified categories, prioritize those FAQs
-            if likely_categories:
-                for faq in faqs:
-                    if faq['category'] in likely_categories:
-                        filtered_faqs.append(faq)
-                
-                # Add some FAQs from other categories to provide context
-                additional_faqs = [faq for faq in faqs if faq['category'] not in likely_categories][:5]
-                filtered_faqs.extend(additional_faqs)
-            else:
-                # Otherwise, use a mix of all categories
-                filtered_faqs = faqs[:15]
-            
-            # Build prompt with selected FAQs
-            prompt_faqs = "\n".join([
-                f"Category: {faq['category']}\nQ: {faq['question']}\nA: {faq['answer']}"
-                for faq in filtered_faqs
-            ])
+            # Build prompt with the best FAQs that fit the context budget
+            prompt_faqs = "\n".join(
+                format_context_faq(faq) for faq in select_context_faqs(message, likely_categories)
+            )
             
             # Determine if any specific categories were identified
             category_info = ""
@@ -2,6 +2,7 @@ import os
 import json
 import logging
 from openai import OpenAI
+from faq_classifier import FaqClassifier, LLM_FALLBACK
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -24,6 +25,9 @@ class Chatbot:
         
         # Initialize FAQ categorization
         self._organize_faqs_by_category()
+        
+        # Classify and rank locally so most messages need only the answering call
+        self.classifier = FaqClassifier(self.faqs)
 
     def _organize_faqs_by_category(self):
         """Organize FAQs by category for quick retrieval."""
@@ -46,6 +50,18 @@ class Chatbot:
             raise
 
     def _find_relevant_faqs(self, text, top_k=3):
+        """Find the most relevant FAQs locally, asking OpenAI only when unsure."""
+        try:
+            relevant_faqs, confidence = self.classifier.rank(text, top_k)
+            if self.classifier.is_confident(confidence) or not LLM_FALLBACK:
+                logger.info(f"Ranked FAQs locally with confidence {confidence:.2f}")
+                return relevant_faqs
+            logger.info(f"Local confidence {confidence:.2f} too low, ranking FAQs with OpenAI")
+        except Exception as e:
+            logger.error(f"Error ranking FAQs locally: {e}")
+        return self._find_relevant_faqs_llm(text, top_k)
+
+    def _find_relevant_faqs_llm(self, text, top_k=3):
         """Find the most relevant FAQs using OpenAI's capabilities."""
         try:
             # Create a completion to analyze the query and identify relevant categories
@@ -0,0 +1,195 @@
+import logging
+from collections import deque
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Score boosts for FAQs in a category, applied when the message mentions a
+# category word. A rule fires if any of its terms occurs anywhere in the
+# lowercased message; question_contains further limits it to FAQs whose
+# question contains that text.
+BOOST_RULES = [
+    {
+        'name': 'payment_terms',
+        'category': 'Payments',
+        'terms': ['payment', 'payments', 'pay', 'paid', 'card', 'credit', 'debit',
+                  'visa', 'mastercard', 'paypal', 'apple pay', 'google pay',
+                  'method', 'methods', 'charge', 'billing', 'installment',
+                  'rupee', 'rupees', 'inr', '₹', 'upi', 'paytm', 'phonepe', 'gpay',
+                  'bhim', 'net banking', 'emi', 'hdfc', 'icici', 'sbi', 'axis',
+                  'rupay', 'gst', 'india', 'indian'],
+        'boost': 8,
+    },
+    {
+        'name': 'payment_methods_question',
+        'category': 'Payments',
+        'terms': ['what payment methods'],
+        'question_contains': 'payment methods',
+        'boost': 10,
+    },
+    {
+        'name': 'indian_payment_methods',
+        'category': 'Payments',
+        'terms': ['india', 'indian', 'rupee', 'rupees', 'inr', '₹', 'upi'],
+        'question_contains': 'indian',
+        'boost': 15,
+    },
+]
+
+# Message words that point at a category when no FAQ matched directly
+CATEGORY_KEYWORDS = {
+    'product': 'Products', 'products': 'Products', 'item': 'Products', 'items': 'Products',
+    'shipping': 'Shipping', 'delivery': 'Shipping', 'ship': 'Shipping',
+    'return': 'Returns', 'refund': 'Returns', 'exchange': 'Returns',
+    'payment': 'Payments', 'payments': 'Payments', 'pay': 'Payments', 'paid': 'Payments',
+    'card': 'Payments', 'credit': 'Payments', 'debit': 'Payments', 'paypal': 'Payments',
+    'method': 'Payments', 'methods': 'Payments', 'visa': 'Payments', 'mastercard': 'Payments',
+    'billing': 'Payments', 'rupee': 'Payments', 'rupees': 'Payments', 'inr': 'Payments',
+    '₹': 'Payments', 'upi': 'Payments', 'paytm': 'Payments', 'phonepe': 'Payments',
+    'gpay': 'Payments', 'bhim': 'Payments', 'netbanking': 'Payments', 'emi': 'Payments',
+    'hdfc': 'Payments', 'icici': 'Payments', 'sbi': 'Payments', 'axis': 'Payments',
+    'rupay': 'Payments', 'gst': 'Payments', 'india': 'Payments', 'indian': 'Payments',
+    'account': 'Account', 'login': 'Account', 'profile': 'Account',
+}
+
+# Weights of shared question words and shared category words
+QUESTION_WORD_WEIGHT = 2
+CATEGORY_WORD_WEIGHT = 3
+
+# Score of every FAQ in the category named by "tell me about <category>"
+CATEGORY_REQUEST_SCORE = 2
+CATEGORY_REQUEST_PREFIX = "tell me about "
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton reporting which labels' patterns occur in a text.
+
+    One pass over the text finds every pattern occurrence, however many
+    patterns there are, so matching cost depends on the message length only.
+    """
+
+    def __init__(self, patterns):
+        """Compile (pattern, label) pairs into a goto/fail automaton."""
+        self._goto = [{}]
+        self._output = [set()]
+        for pattern, label in patterns:
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._output.append(set())
+                node = next_node
+            self._output[node].add(label)
+
+        # Breadth-first fail links; each node inherits the outputs of its fail target
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] |= self._output[self._fail[child]]
+                queue.append(child)
+        self._output = [frozenset(labels) for labels in self._output]
+
+    def labels_in(self, text):
+        """Return the labels of every pattern occurring in text."""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found |= output[node]
+        return found
+
+class FaqMatcher:
+    """Keyword scorer for the /ask route, compiled once from the FAQ list.
+
+    Question and category word sets are indexed by word, so only FAQs that
+    share a word with the message are scored, and all boost terms are found
+    in one automaton pass.
+    """
+
+    def __init__(self, faqs, boost_rules=BOOST_RULES, category_keywords=CATEGORY_KEYWORDS):
+        """Precompute FAQ token sets, the word index and the boost automaton."""
+        self.faqs = faqs
+        self.boost_rules = boost_rules
+        self.category_keywords = category_keywords
+
+        self._question_index = {}
+        self._category_index = {}
+        self._faqs_by_category = {}
+        self._eligible_rules = []
+        for position, faq in enumerate(faqs):
+            for word in set(faq['question'].lower().split()):
+                self._question_index.setdefault(word, []).append(position)
+            for word in set(faq['category'].lower().split()):
+                self._category_index.setdefault(word, []).append(position)
+            self._faqs_by_category.setdefault(faq['category'].lower(), []).append(position)
+
+            # Rules that can ever boost this FAQ, decided once rather than per message
+            question = faq['question'].lower()
+            self._eligible_rules.append(frozenset(
+                rule_id for rule_id, rule in enumerate(boost_rules)
+                if rule['category'] == faq['category'] and rule.get('question_contains', '') in question
+            ))
+
+        self._automaton = KeywordAutomaton(
+            (term, rule_id) for rule_id, rule in enumerate(boost_rules) for term in rule['terms']
+        )
+        logger.info(f"Compiled FAQ matcher over {len(faqs)} FAQs and {len(boost_rules)} boost rules")
+
+    def match(self, message):
+        """Return (faq, score) pairs with a positive score, best first.
+
+        Ties keep FAQ order, with "tell me about <category>" matches ahead of
+        keyword matches, as the original per-request loops ranked them.
+        """
+        lowered = message.lower()
+        matches = []
+
+        if lowered.startswith(CATEGORY_REQUEST_PREFIX):
+            category = lowered.replace(CATEGORY_REQUEST_PREFIX, "").strip()
+            matches.extend((self.faqs[position], CATEGORY_REQUEST_SCORE)
+                           for position in self._faqs_by_category.get(category, ()))
+
+        message_words = set(lowered.split())
+        question_matches = {}
+        category_matches = {}
+        for word in message_words:
+            for position in self._question_index.get(word, ()):
+                question_matches[position] = question_matches.get(position, 0) + 1
+            for position in self._category_index.get(word, ()):
+                category_matches[position] = category_matches.get(position, 0) + 1
+
+        fired_rules = self._automaton.labels_in(lowered) if category_matches else set()
+        scored = []
+        for position in sorted(question_matches.keys() | category_matches.keys()):
+            score = question_matches.get(position, 0) * QUESTION_WORD_WEIGHT
+            if position in category_matches:
+                score += category_matches[position] * CATEGORY_WORD_WEIGHT
+                for rule_id in fired_rules & self._eligible_rules[position]:
+                    score += self.boost_rules[rule_id]['boost']
+            scored.append((self.faqs[position], score))
+
+        matches.extend(scored)
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def likely_categories(self, message):
+        """Return the categories named by keywords among the message's words."""
+        return {
+            self.category_keywords[word]
+            for word in message.lower().split()
+            if word in self.category_keywords
+        }
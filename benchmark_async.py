@@ -0,0 +1,50 @@
+import sys
+import time
+import asyncio
+import argparse
+import logging
+import llm_stub_server
+from async_chatbot_service import AsyncChatbotService
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def run(n_requests, delay, max_concurrency):
+    """Fire concurrent RAG requests at a local stub and report throughput."""
+    server, base_url = llm_stub_server.start_server(config=llm_stub_server.StubConfig(delay=delay))
+    service = AsyncChatbotService(max_concurrency=max_concurrency, base_url=base_url)
+    try:
+        # Every question is worded differently, so each is its own prompt and
+        # single flight cannot merge them; all are sent before any answer
+        # arrives, so none is served from the semantic cache
+        questions = [f"Question {i} about delivery to zone {i}" for i in range(n_requests)]
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(service.get_rag_response(q) for q in questions))
+        elapsed = time.perf_counter() - start
+
+        sources = {}
+        for _, source in results:
+            sources[source] = sources.get(source, 0) + 1
+        print(f"{n_requests} requests, {delay:.2f}s upstream latency, concurrency {max_concurrency}")
+        print(f"  wall time {elapsed:.2f}s, {n_requests / elapsed:.1f} req/s, sources {sources}")
+        upstream_calls = server.RequestHandlerClass.config.requests
+        print(f"  sequential lower bound {n_requests * delay:.2f}s, stub saw {upstream_calls} calls")
+        # Otherwise the wall time says nothing about concurrent upstream calls
+        assert upstream_calls == sources.get('rag', 0), "some answers did not come from their own upstream call"
+    finally:
+        await service.aclose()
+        server.shutdown()
+
+def main(argv=None):
+    """Parse arguments and run the async service benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark AsyncChatbotService against a local completion stub.")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=0.5)
+    parser.add_argument('--concurrency', type=int, default=64)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    asyncio.run(run(args.requests, args.delay, args.concurrency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import sys
+import time
+import argparse
+import logging
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from nltk_processor import MAX_BATCH_SCORES
+from retrieval import score_queries, top_k_indices, top_k_indices_batch
+from inverted_index import InvertedIndex
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [51, 1000, 10000, 100000, 200000]
+
+# The most frequent synthetic words stand in for English stop words, which the
+# real vectorizer drops before they can reach a posting list
+SYNTHETIC_STOP_WORDS = [f"w{i}" for i in range(100)]
+
+def make_corpus(n_docs, vocab_size=20000, seed=0):
+    """Generate a synthetic FAQ-like corpus with a Zipfian word distribution."""
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"w{i}" for i in range(vocab_size)])
+    lengths = rng.integers(6, 14, size=n_docs)
+    words = rng.zipf(1.3, size=int(lengths.sum())) % vocab_size
+    docs = []
+    offset = 0
+    for length in lengths:
+        docs.append(" ".join(vocab[words[offset:offset + length]]))
+        offset += length
+    return docs
+
+def legacy_top_k(query_vector, question_vectors, top_k):
+    """Score and select the way NLTKProcessor did before the scoring kernel."""
+    similarities = cosine_similarity(query_vector, question_vectors).flatten()
+    return similarities.argsort()[-top_k:][::-1], similarities
+
+def kernel_top_k(query_vector, question_vectors_t, top_k):
+    """Score with the pre-normalized sparse kernel and partial top-k selection."""
+    similarities = score_queries(query_vector, question_vectors_t)[0]
+    return top_k_indices(similarities, top_k), similarities
+
+def time_per_query(fn, query_vectors, *args):
+    """Return the mean latency in milliseconds of fn over every query row."""
+    start = time.perf_counter()
+    for i in range(query_vectors.shape[0]):
+        fn(query_vectors[i], *args)
+    return (time.perf_counter() - start) * 1000 / query_vectors.shape[0]
+
+def run_batch(sizes, n_queries, top_k, chunk_size=1024):
+    """Compare per-query kernel scoring with chunked matrix-matrix scoring."""
+    print(f"{'faqs':>8} {'loop q/s':>12} {'batch q/s':>12} {'speedup':>8}")
+    for n_docs in sizes:
+        corpus = make_corpus(n_docs)
+        queries = make_corpus(n_queries, seed=1)
+
+        vectorizer = TfidfVectorizer()
+        question_vectors_t = vectorizer.fit_transform(corpus).T.tocsr()
+
+        # Vectorization is included on both sides, as the nightly replay pays for it
+        start = time.perf_counter()
+        for query in queries:
+            kernel_top_k(vectorizer.transform([query]), question_vectors_t, top_k)
+        loop_s = time.perf_counter() - start
+
+        # Same dense-block cap as NLTKProcessor.find_best_matches_batch
+        rows = max(1, min(chunk_size, MAX_BATCH_SCORES // n_docs))
+        start = time.perf_counter()
+        for offset in range(0, n_queries, rows):
+            query_vectors = vectorizer.transform(queries[offset:offset + rows])
+            top_k_indices_batch(score_queries(query_vectors, question_vectors_t), top_k)
+        batch_s = time.perf_counter() - start
+
+        print(f"{n_docs:>8} {n_queries / loop_s:>12.0f} {n_queries / batch_s:>12.0f} {loop_s / batch_s:>7.1f}x")
+
+def run_pruned(sizes, n_queries, top_k):
+    """Compare the dense-output kernel with MaxScore top-k over the inverted index."""
+    print(f"{'faqs':>8} {'kernel ms':>10} {'pruned ms':>10} {'speedup':>8}")
+    for n_docs in sizes:
+        corpus = make_corpus(n_docs)
+        queries = make_corpus(n_queries, seed=1)
+
+        vectorizer = TfidfVectorizer(stop_words=SYNTHETIC_STOP_WORDS)
+        question_vectors = vectorizer.fit_transform(corpus).tocsr()
+        question_vectors_t = question_vectors.T.tocsr()
+        index = InvertedIndex(question_vectors_t)
+        query_vectors = vectorizer.transform(queries).tocsr()
+
+        # Pruned top-k must return the exhaustive kernel's ids and scores exactly
+        scores = score_queries(query_vectors, question_vectors_t)
+        for i in range(n_queries):
+            pruned_idx, pruned_scores = index.top_k(query_vectors[i], top_k)
+            kernel_idx = top_k_indices(scores[i], top_k)
+            assert np.array_equal(pruned_idx, kernel_idx)
+            assert np.array_equal(pruned_scores, scores[i][kernel_idx])
+
+        kernel_ms = time_per_query(kernel_top_k, query_vectors, question_vectors_t, top_k)
+        pruned_ms = time_per_query(index.top_k, query_vectors, top_k)
+        print(f"{n_docs:>8} {kernel_ms:>10.3f} {pruned_ms:>10.3f} {kernel_ms / pruned_ms:>7.1f}x")
+
+def run(sizes, n_queries, top_k):
+    """Benchmark legacy and kernel retrieval across corpus sizes."""
+    print(f"{'faqs':>8} {'legacy ms':>10} {'kernel ms':>10} {'speedup':>8}")
+    for n_docs in sizes:
+        corpus = make_corpus(n_docs)
+        queries = make_corpus(n_queries, seed=1)
+
+        vectorizer = TfidfVectorizer()
+        question_vectors = vectorizer.fit_transform(corpus).tocsr()
+        question_vectors_t = question_vectors.T.tocsr()
+        query_vectors = vectorizer.transform(queries).tocsr()
+
+        # Both paths must agree on the selected scores before timing them
+        for i in range(min(n_queries, 20)):
+            legacy_idx, legacy_scores = legacy_top_k(query_vectors[i], question_vectors, top_k)
+            kernel_idx, kernel_scores = kernel_top_k(query_vectors[i], question_vectors_t, top_k)
+            assert np.allclose(legacy_scores, kernel_scores)
+            assert np.allclose(legacy_scores[legacy_idx], kernel_scores[kernel_idx])
+
+        legacy_ms = time_per_query(legacy_top_k, query_vectors, question_vectors, top_k)
+        kernel_ms = time_per_query(kernel_top_k, query_vectors, question_vectors_t, top_k)
+        print(f"{n_docs:>8} {legacy_ms:>10.3f} {kernel_ms:>10.3f} {legacy_ms / kernel_ms:>7.1f}x")
+
+def main(argv=None):
+    """Parse arguments and run the retrieval benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark FAQ retrieval latency against corpus size.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--batch', action='store_true', help="benchmark batched multi-query matching")
+    parser.add_argument('--pruned', action='store_true', help="benchmark inverted-index MaxScore top-k")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    if args.batch:
+        run_batch(args.sizes, args.queries, args.top_k)
+    elif args.pruned:
+        run_pruned(args.sizes, args.queries, args.top_k)
+    else:
+        run(args.sizes, args.queries, args.top_k)
+
+if __name__ == "__main__":
+    main()
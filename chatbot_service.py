@@ -1,13 +1,45 @@
 import os
 import json
+import time
+import hashlib
 import logging
-from openai import OpenAI
+import threading
 from nltk_processor import NLTKProcessor
+from response_cache import ResponseCache
+import semantic_cache
+from latency_metrics import LatencyTracker, startup_profile
+from answer_router import AnswerRouter
+from prompt_builder import PromptBuilder
+from single_flight import SingleFlight
+from resilience import ResilientCaller, Deadline, DeadlineExceeded
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+RAG_MODEL = "gpt-4o"  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
+
+RAG_SYSTEM_PROMPT = ("You are AURORA, an advanced customer support agent for an e-commerce website with a "
+                     "Matrix-themed interface. Your answers should be helpful, accurate, "
+                     "and styled with subtle references to The Matrix movie. Occasionally use phrases like "
+                     "'Welcome to the Matrix', 'The truth is out there', or 'Follow the white rabbit'. "
+                     "Use the provided FAQs to ground your answers in factual information. "
+                     "If the FAQs don't contain the exact answer, use what is most "
+                     "relevant and indicate when you're extrapolating. If nothing is "
+                     "relevant, admit you don't know rather than making up information. "
+                     "Keep your answers concise and to the point, with a maximum of "
+                     "3-4 sentences unless more detail is required. Sign off with 'AURORA' for important responses.")
+
+RAG_ERROR_MESSAGE = "I'm experiencing a glitch in the Matrix. Please try your question again later."
+
+def _prepend(first, chunks):
+    """Yield an already received chunk, then the rest of a stream, closing it if abandoned."""
+    try:
+        yield first
+        yield from chunks
+    finally:
+        chunks.close()
+
 class ChatbotService:
     def __init__(self):
         """Initialize the chatbot service with NLTK and OpenAI capabilities."""
@@ -15,19 +47,84 @@ class ChatbotService:
             # Initialize NLTK processor
             self.nltk_processor = NLTKProcessor()
             
-            # Initialize OpenAI client
-            self.openai_client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+            # The OpenAI client is created on first use; importing openai alone takes most of a second
+            self._openai_client = None
+            self._openai_lock = threading.Lock()
+            
+            # Pack retrieved FAQs into a token budget behind a constant system prompt
+            self.prompt_builder = PromptBuilder(RAG_SYSTEM_PROMPT, RAG_MODEL)
+            
+            # Identical prompts already being answered share the one upstream call
+            self.single_flight = SingleFlight()
+            
+            # Deadlines, hedged retries and a circuit breaker around the completion API
+            self.llm_caller = ResilientCaller()
+            
+            # Cache final answers so repeated questions skip retrieval and the LLM
+            self.response_cache = ResponseCache()
+            
+            # Reuse LLM answers for paraphrases that retrieve the same FAQs
+            with startup_profile.phase('semantic_cache'):
+                self.semantic_cache = semantic_cache.from_environment()
+            
+            # Rolling latency samples, e.g. first-token vs total RAG latency
+            self.latency = LatencyTracker()
+            
+            # Try cheap answer tiers before the LLM, per the configured routing policy
+            self.router = AnswerRouter(self)
             
             logger.info("ChatbotService initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing ChatbotService: {e}")
             raise
     
-    def get_nltk_response(self, text):
+    @property
+    def openai_client(self):
+        """The OpenAI client, imported and constructed on first use."""
+        if self._openai_client is None:
+            with self._openai_lock:
+                if self._openai_client is None:
+                    from openai import OpenAI
+                    # Retries are owned by llm_caller, which knows the request deadline
+                    self._openai_client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), max_retries=0)
+        return self._openai_client
+    
+    @openai_client.setter
+    def openai_client(self, client):
+        """Use a preconfigured client, e.g. one pointed at a local stub."""
+        self._openai_client = client
+    
+    def shutdown(self):
+        """Stop background work once this instance has been swapped out."""
+        self.nltk_processor.shutdown()
+    
+    def before_fork(self):
+        """Quiesce background work and close handles a pre-fork master must not pass on."""
+        self.nltk_processor.before_fork()
+        self.semantic_cache.before_fork()
+    
+    def after_fork(self):
+        """Give a forked worker its own locks, connections and background threads."""
+        self.nltk_processor.after_fork()
+        self.semantic_cache.after_fork()
+        # The client's connection pool was opened in the master; build a new one on first use
+        self._openai_client = None
+        self._openai_lock = threading.Lock()
+    
+    def retrieve(self, text, top_k=3, category=None):
+        """Score a query once so both response paths can share the result.
+        
+        A category limits scoring to that category's FAQs.
+        """
+        return self.nltk_processor.retrieve(text, top_k=top_k, category=category)
+    
+    def get_nltk_response(self, text, retrieval=None, category=None):
         """Get response using NLTK-based FAQ matching."""
         try:
-            # Find best matching FAQ
-            best_match, confidence = self.nltk_processor.find_best_match(text)
+            # Find best matching FAQ, reusing an existing retrieval if given
+            if retrieval is None:
+                retrieval = self.retrieve(text, category=category)
+            best_match, confidence = retrieval.best_match, retrieval.best_score
             
             if best_match:
                 answer = best_match['answer']
@@ -41,48 +138,222 @@ class ChatbotService:
             logger.error(f"Error getting NLTK response: {e}")
             return "I encountered an error processing your question.", 'error', 0.0
     
-    def get_rag_response(self, text):
+    def get_nltk_responses_batch(self, texts, top_k=3, category=None):
+        """Get NLTK-based answers for many messages in one batched retrieval."""
+        try:
+            retrievals = self.nltk_processor.find_best_matches_batch(list(texts), top_k=top_k, category=category)
+            return [
+                (retrieval.best_match['answer'], 'nltk', retrieval.best_score)
+                if retrieval.best_match else (None, 'nltk', retrieval.best_score)
+                for retrieval in retrievals
+            ]
+        except Exception as e:
+            logger.error(f"Error getting batch NLTK responses: {e}")
+            return [("I encountered an error processing your question.", 'error', 0.0) for _ in texts]
+    
+    def build_rag_request(self, text, top_matches):
+        """Build the chat completion arguments for a question and its top FAQs."""
+        plan = self.prompt_builder.build(text, top_matches)
+        return {
+            'model': RAG_MODEL,
+            'messages': plan.messages,
+            'temperature': 0.7,
+            'max_tokens': 500
+        }
+    
+    def lexical_fallback(self, retrieval):
+        """Return the best retrieved FAQ answer for when the LLM cannot answer in time."""
+        if retrieval is not None and retrieval.top_matches:
+            return retrieval.top_matches[0][0]['answer'], "fallback"
+        return RAG_ERROR_MESSAGE, "error"
+    
+    @staticmethod
+    def rag_flight_key(request):
+        """Return the key under which identical in-flight RAG requests are coalesced.
+        
+        The key is a hash of the model and messages actually sent, with only
+        case and runs of whitespace normalized, so any difference in wording
+        makes a separate request.
+        """
+        payload = json.dumps([
+            request['model'],
+            [(message['role'], " ".join(message['content'].lower().split())) for message in request['messages']]
+        ])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get_rag_response(self, text, retrieval=None, timeout=None, category=None):
         """Get response using RAG approach with OpenAI."""
         try:
-            # Find top relevant FAQs using NLTK
-            top_matches = self.nltk_processor.find_top_matches(text, top_k=3)
-            
-            # Format the FAQs for input to GPT
-            if top_matches:
-                formatted_faqs = "\n\n".join([
-                    f"FAQ {i+1}:\nQuestion: {faq['question']}\nAnswer: {faq['answer']}\nCategory: {faq['category']}"
-                    for i, (faq, _) in enumerate(top_matches)
-                ])
-            else:
-                formatted_faqs = "No specific FAQ matches found for this query."
+            # Find top relevant FAQs using NLTK, reusing an existing retrieval if given
+            if retrieval is None:
+                retrieval = self.retrieve(text, top_k=3, category=category)
+            top_matches = retrieval.top_matches
+            
+            # The prompt depends only on the retrieved FAQs and the question,
+            # so a close paraphrase over the same FAQs can reuse the answer
+            generation = self.nltk_processor.tfidf_index.content_hash
+            cached_answer = self.semantic_cache.get(retrieval.top_ids, retrieval.query_vector, generation,
+                                                    retrieval.unknown_terms)
+            if cached_answer is not None:
+                logger.info("Answered RAG query from semantic cache")
+                return cached_answer, "rag"
             
             # Generate response using GPT
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
-                messages=[
-                    {"role": "system", "content": "You are AURORA, an advanced customer support agent for an e-commerce website with a "
-                                                 "Matrix-themed interface. Your answers should be helpful, accurate, "
-                                                 "and styled with subtle references to The Matrix movie. Occasionally use phrases like "
-                                                 "'Welcome to the Matrix', 'The truth is out there', or 'Follow the white rabbit'. "
-                                                 "Use the provided FAQs to ground your answers in factual information. "
-                                                 "If the FAQs don't contain the exact answer, use what is most "
-                                                 "relevant and indicate when you're extrapolating. If nothing is "
-                                                 "relevant, admit you don't know rather than making up information. "
-                                                 "Keep your answers concise and to the point, with a maximum of "
-                                                 "3-4 sentences unless more detail is required. Sign off with 'AURORA' for important responses."},
-                    {"role": "user", "content": f"Based on these relevant FAQs:\n\n{formatted_faqs}\n\nPlease answer this question: {text}"}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            answer = response.choices[0].message.content
-            logger.info("Generated RAG response using OpenAI")
+            request = self.build_rag_request(text, top_matches)
             
+            def attempt(remaining):
+                start = time.perf_counter()
+                response = self.openai_client.chat.completions.create(**request, timeout=remaining)
+                self.latency.record('rag_total', (time.perf_counter() - start) * 1000)
+                return response.choices[0].message.content
+            
+            def complete():
+                answer = self.llm_caller.call(attempt, timeout)
+                logger.info("Generated RAG response using OpenAI")
+                self.semantic_cache.put(retrieval.top_ids, retrieval.query_vector, answer, generation,
+                                        retrieval.unknown_terms)
+                return answer
+            
+            answer = self.single_flight.do(self.rag_flight_key(request), complete, timeout)
             return answer, "rag"
         except Exception as e:
             logger.error(f"Error generating RAG response: {e}")
-            return "I'm experiencing a glitch in the Matrix. Please try your question again later.", "error"
+            return self.lexical_fallback(retrieval)
+    
+    def stream_rag_response(self, text, retrieval=None, on_complete=None, timeout=None, category=None):
+        """Yield a RAG answer in chunks as the completion is generated.
+        
+        on_complete, if given, is called with the answer and its source once
+        the answer is settled: 'rag' after a full stream, 'fallback' or
+        'error' before the stand-in answer is yielded, and 'error' with the
+        partial answer when the stream breaks off. timeout bounds the whole
+        stream, not just each read.
+        """
+        chunks = []
+        deadline = Deadline(timeout)
+        # Set once the LLM is actually called, and cleared once its outcome
+        # reaches the breaker
+        breaker = None
+        try:
+            if retrieval is None:
+                retrieval = self.retrieve(text, top_k=3, category=category)
+            
+            generation = self.nltk_processor.tfidf_index.content_hash
+            cached_answer = self.semantic_cache.get(retrieval.top_ids, retrieval.query_vector, generation,
+                                                    retrieval.unknown_terms)
+            if cached_answer is not None:
+                logger.info("Answered RAG query from semantic cache")
+                yield cached_answer
+                if on_complete:
+                    on_complete(cached_answer, "rag")
+                return
+            
+            if not self.llm_caller.breaker.allow():
+                logger.warning("LLM circuit breaker is open, streaming the lexical fallback")
+                answer, source = self.lexical_fallback(retrieval)
+                if on_complete:
+                    on_complete(answer, source)
+                yield answer
+                return
+            breaker = self.llm_caller.breaker
+            
+            request = self.build_rag_request(text, retrieval.top_matches)
+            if timeout is not None:
+                request['timeout'] = timeout
+            start = time.perf_counter()
+            stream = self.openai_client.chat.completions.create(stream=True, **request)
+            
+            for chunk in stream:
+                if deadline.expired():
+                    raise DeadlineExceeded(f"RAG stream still running after {timeout}s")
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if not chunks:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                    self.latency.record('rag_first_token', first_token_ms)
+                chunks.append(delta)
+                yield delta
+            
+            total_ms = (time.perf_counter() - start) * 1000
+            self.latency.record('rag_stream_total', total_ms)
+            logger.info(f"Streamed RAG response using OpenAI in {total_ms:.0f} ms")
+            
+            breaker.record_success()
+            breaker = None
+            
+            answer = "".join(chunks)
+            self.semantic_cache.put(retrieval.top_ids, retrieval.query_vector, answer, generation,
+                                    retrieval.unknown_terms)
+            if on_complete:
+                on_complete(answer, "rag")
+        except Exception as e:
+            logger.error(f"Error streaming RAG response: {e}")
+            if breaker is not None:
+                breaker.record_failure()
+                breaker = None
+            # Only replace the answer if nothing reached the user yet
+            if chunks:
+                if on_complete:
+                    on_complete("".join(chunks), "error")
+            else:
+                answer, source = self.lexical_fallback(retrieval)
+                if on_complete:
+                    on_complete(answer, source)
+                yield answer
+        finally:
+            # A client that dropped the stream left no outcome; free the
+            # breaker's probe slot in case this call was the probe
+            if breaker is not None:
+                breaker.release()
+    
+    def response_cache_key(self, text, category=None):
+        """Return the response cache key and corpus generation for a message."""
+        generation = self.nltk_processor.tfidf_index.content_hash
+        cache_key = self.response_cache.make_key(self.nltk_processor.preprocess_text(text), category)
+        return cache_key, generation
+    
+    def route(self, text, category=None):
+        """Answer a user message through the tiered router, returning its RouteDecision."""
+        return self.router.route(text, category)
+    
+    def respond(self, text, category=None):
+        """Answer a user message, returning (answer, source)."""
+        decision = self.route(text, category)
+        return decision.answer, decision.source
+    
+    def chat(self, text, category=None):
+        """Answer a user message, falling back from the NLTK match to RAG."""
+        return self.respond(text, category)[0]
+    
+    def stream_chat(self, text, category=None):
+        """Answer a user message incrementally, returning (chunk iterator, source).
+        
+        Answers from the local tiers arrive as a single chunk; RAG answers
+        stream token by token as the model generates them. The first chunk is
+        produced before returning, so a fallback in place of the LLM answer
+        is reported as the source.
+        """
+        decision = self.router.answer_locally(text, category)
+        if decision.answered:
+            self.router.finish(decision)
+            return iter([decision.answer]), decision.source
+        
+        def finish(answer, source):
+            self.router.finish(decision, answer, source)
+        
+        chunks = self.stream_rag_response(
+            text,
+            retrieval=decision.retrieval,
+            on_complete=finish,
+            timeout=self.router.llm_timeout(decision)
+        )
+        first = next(chunks, None)
+        if first is None:
+            return chunks, 'rag'
+        return _prepend(first, chunks), decision.source or 'rag'
     
     def get_categories(self):
         """Return unique categories from FAQs for quick reply buttons."""
@@ -0,0 +1,277 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import logging
+import tempfile
+import numpy as np
+import tfidf_index
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# FAISS is optional; small corpora are served by NumPy brute force
+try:
+    import faiss
+    use_faiss = True
+except ImportError:
+    faiss = None
+    use_faiss = False
+
+DEFAULT_MODEL_NAME = os.environ.get('DENSE_MODEL_NAME', 'all-MiniLM-L6-v2')
+DEFAULT_INDEX_DIR = tfidf_index.DEFAULT_INDEX_DIR
+
+# Corpora below this size are searched exactly with one matrix-vector product
+BRUTE_FORCE_MAX_DOCUMENTS = 20000
+
+# How many ANN candidates to pull per query before filling the score vector
+ANN_CANDIDATE_MULTIPLIER = 10
+
+def _normalize_rows(vectors):
+    """L2-normalize embedding rows so inner product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def _model_slug(model_name):
+    """Turn a model name into something safe for a directory name."""
+    return re.sub(r'[^A-Za-z0-9]+', '-', model_name).strip('-').lower()
+
+class DenseEncoder:
+    """Lazily loaded local sentence-transformer that encodes text in batches."""
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, batch_size=64):
+        """Remember the model to load; nothing is loaded until first use."""
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+
+    @property
+    def model(self):
+        """Return the sentence-transformer model, loading it on first access."""
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+            logger.info(f"Loaded sentence transformer model: {self.model_name}")
+        return self._model
+
+    def encode(self, texts):
+        """Return L2-normalized float32 embeddings for a list of texts."""
+        embeddings = self.model.encode(list(texts), batch_size=self.batch_size, show_progress_bar=False)
+        return _normalize_rows(embeddings)
+
+class DenseIndex:
+    """Precomputed FAQ question embeddings behind a brute-force or ANN search."""
+
+    def __init__(self, embeddings, encoder, backend='auto', content_hash=None, ann_index=None):
+        """Wrap normalized embeddings and pick a search backend for them."""
+        self.embeddings = embeddings
+        self.encoder = encoder
+        self.content_hash = content_hash
+
+        if backend == 'auto':
+            backend = 'numpy' if len(embeddings) <= BRUTE_FORCE_MAX_DOCUMENTS or not use_faiss else 'hnsw'
+        if backend in ('hnsw', 'ivf') and not use_faiss:
+            logger.warning(f"FAISS is not installed, using NumPy brute force instead of {backend}")
+            backend = 'numpy'
+        self.backend = backend
+
+        if backend != 'numpy' and ann_index is None:
+            ann_index = self._build_ann_index(embeddings, backend)
+        self.ann_index = ann_index
+
+    @staticmethod
+    def _build_ann_index(embeddings, backend):
+        """Build an inner-product FAISS index of the requested type."""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        dimension = embeddings.shape[1]
+        if backend == 'hnsw':
+            index = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+        elif backend == 'ivf':
+            n_lists = max(1, int(np.sqrt(len(embeddings))))
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFFlat(quantizer, dimension, n_lists, faiss.METRIC_INNER_PRODUCT)
+            index.train(embeddings)
+            index.nprobe = min(n_lists, 8)
+        else:
+            raise ValueError(f"Unknown dense index backend: {backend}")
+        index.add(embeddings)
+        return index
+
+    @classmethod
+    def build(cls, questions, encoder, backend='auto', content_hash=None):
+        """Encode FAQ questions and index them."""
+        embeddings = encoder.encode(questions)
+        return cls(embeddings, encoder, backend, content_hash)
+
+    def with_rows(self, source_rows, new_questions, content_hash=None):
+        """Return a new index laid out by source_rows, encoding only new questions.
+
+        Mirrors TfidfIndex.with_rows: -1 entries take the next question in
+        new_questions. ANN backends are rebuilt over the patched embeddings.
+        """
+        source_rows = np.asarray(source_rows, dtype=np.intp)
+        fresh = source_rows < 0
+        embeddings = np.empty((len(source_rows), self.embeddings.shape[1]), dtype=np.float32)
+        embeddings[~fresh] = np.asarray(self.embeddings)[source_rows[~fresh]]
+        if fresh.any():
+            embeddings[fresh] = self.encoder.encode(new_questions)
+        return DenseIndex(embeddings, self.encoder, self.backend, content_hash)
+
+    def encode(self, texts):
+        """Encode query texts in batches with the index's encoder."""
+        return self.encoder.encode(texts)
+
+    def search(self, query_embeddings, top_k):
+        """Return (indices, scores) of the top_k FAQs for each query embedding."""
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        top_k = min(top_k, len(self.embeddings))
+        if self.ann_index is not None:
+            scores, indices = self.ann_index.search(query_embeddings, top_k)
+            return indices, scores
+
+        scores = query_embeddings @ np.asarray(self.embeddings).T
+        indices = np.argpartition(scores, -top_k, axis=1)[:, -top_k:]
+        order = np.argsort(np.take_along_axis(scores, indices, axis=1), axis=1)[:, ::-1]
+        indices = np.take_along_axis(indices, order, axis=1)
+        return indices, np.take_along_axis(scores, indices, axis=1)
+
+    def score_matrix(self, query_embeddings, top_k=3, rows=None):
+        """Return a queries x FAQs cosine score matrix for fusing with lexical scores.
+
+        Brute force fills every entry. ANN backends only fill the candidates
+        they return, leaving the rest at zero. If rows is given, only those
+        FAQ columns are returned, in that order.
+        """
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        if self.ann_index is None:
+            embeddings = np.asarray(self.embeddings)
+            if rows is not None:
+                embeddings = embeddings[rows]
+            return query_embeddings @ embeddings.T
+
+        scores = np.zeros((len(query_embeddings), len(self.embeddings)), dtype=np.float32)
+        indices, candidate_scores = self.search(query_embeddings, top_k * ANN_CANDIDATE_MULTIPLIER)
+        query_rows = np.repeat(np.arange(len(query_embeddings)), indices.shape[1])
+        valid = indices.ravel() >= 0
+        scores[query_rows[valid], indices.ravel()[valid]] = candidate_scores.ravel()[valid]
+        return scores if rows is None else scores[:, rows]
+
+    @staticmethod
+    def artifact_path(index_dir, content_hash, model_name):
+        """Return the artifact directory for a corpus hash and embedding model."""
+        return os.path.join(index_dir, f"dense-{content_hash[:16]}-{_model_slug(model_name)}")
+
+    def save(self, index_dir=DEFAULT_INDEX_DIR):
+        """Write the embeddings (and ANN index, if any) as a versioned artifact."""
+        if not self.content_hash:
+            raise ValueError("Cannot persist a dense index without a corpus hash")
+
+        final_path = self.artifact_path(index_dir, self.content_hash, self.encoder.model_name)
+        if os.path.isdir(final_path):
+            return final_path
+
+        os.makedirs(index_dir, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix='.dense-', dir=index_dir)
+        try:
+            np.save(os.path.join(tmp_path, 'embeddings.npy'), np.asarray(self.embeddings, dtype=np.float32))
+            if self.ann_index is not None:
+                faiss.write_index(self.ann_index, os.path.join(tmp_path, f'{self.backend}.faiss'))
+
+            manifest = {
+                'format_version': tfidf_index.FORMAT_VERSION,
+                'corpus_sha256': self.content_hash,
+                'model_name': self.encoder.model_name,
+                'backend': self.backend,
+                'n_documents': int(len(self.embeddings)),
+                'dimension': int(self.embeddings.shape[1]),
+                'created_at': time.time(),
+            }
+            with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+
+            # Publish atomically; a concurrent writer may have beaten us to it
+            try:
+                os.rename(tmp_path, final_path)
+            except OSError:
+                if not os.path.isdir(final_path):
+                    raise
+                shutil.rmtree(tmp_path, ignore_errors=True)
+
+            logger.info(f"Saved dense index artifact to {final_path}")
+            return final_path
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, index_dir, content_hash, encoder, backend='auto'):
+        """Memory-map saved embeddings for a corpus hash, or return None."""
+        path = cls.artifact_path(index_dir, content_hash, encoder.model_name)
+        manifest_path = os.path.join(path, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return None
+
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('corpus_sha256') != content_hash or manifest.get('model_name') != encoder.model_name:
+            logger.info(f"Ignoring stale dense index artifact at {path}")
+            return None
+
+        embeddings = np.load(os.path.join(path, 'embeddings.npy'), mmap_mode='r')
+
+        # Reuse the saved ANN structure when the requested backend matches it
+        ann_index = None
+        saved_backend = manifest.get('backend')
+        if backend in ('auto', saved_backend) and saved_backend != 'numpy' and use_faiss:
+            ann_index = faiss.read_index(os.path.join(path, f'{saved_backend}.faiss'))
+            backend = saved_backend
+
+        logger.info(f"Memory-mapped dense index artifact from {path}")
+        return cls(embeddings, encoder, backend, content_hash, ann_index)
+
+def load_or_build(corpus_path, questions, encoder=None, index_dir=DEFAULT_INDEX_DIR, backend='auto', persist=True):
+    """Load the dense index for a corpus, re-encoding only if its hash changed."""
+    encoder = encoder or DenseEncoder()
+    content_hash = tfidf_index.corpus_hash(corpus_path)
+
+    try:
+        index = DenseIndex.load(index_dir, content_hash, encoder, backend)
+        if index is not None:
+            return index
+    except Exception as e:
+        logger.error(f"Error loading dense index artifact, re-encoding: {e}")
+
+    index = DenseIndex.build(questions, encoder, backend, content_hash)
+    logger.info(f"Encoded {len(index.embeddings)} questions into a {index.backend} dense index")
+
+    if persist:
+        try:
+            index.save(index_dir)
+        except Exception as e:
+            logger.warning(f"Could not persist dense index artifact: {e}")
+
+    return index
+
+def main(argv=None):
+    """Encode the current FAQ corpus and write the dense index artifact offline."""
+    import faq_store
+
+    argv = sys.argv[1:] if argv is None else argv
+    index_dir = argv[0] if argv else DEFAULT_INDEX_DIR
+    backend = argv[1] if len(argv) > 1 else 'auto'
+
+    try:
+        faqs = faq_store.load()
+        index = load_or_build(faq_store.DEFAULT_FAQ_PATH, faqs.iter_questions(), index_dir=index_dir, backend=backend)
+        logger.info(f"Dense index artifact ready ({index.backend}, {len(index.embeddings)} vectors)")
+    except Exception as e:
+        logger.error(f"Error building dense index artifact: {e}")
+        raise
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import json
+import hashlib
+from dataclasses import dataclass, field
+import numpy as np
+from inverted_index import InvertedIndex
+
+def faq_key(faq):
+    """Return the identity of an FAQ entry; the question text is its natural key."""
+    return faq['question'].strip()
+
+def faq_content(faq):
+    """Return the fields that make two versions of an FAQ entry equal."""
+    return faq.get('category') or 'General', faq['question'], faq['answer']
+
+def next_generation(generation, payload):
+    """Derive a new cache generation from the previous one and a change description."""
+    digest = hashlib.sha256()
+    digest.update((generation or '').encode('utf-8'))
+    digest.update(json.dumps(payload, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+@dataclass
+class CategoryPartition:
+    """Rows of one category and the term-major TF-IDF sub-matrix over just those rows."""
+
+    rows: np.ndarray
+    question_vectors_t: object
+    _inverted_index: object = field(default=None, repr=False)
+
+    @property
+    def inverted_index(self):
+        """Posting-list view of the partition for pruned top-k, built on first use."""
+        if self._inverted_index is None:
+            self._inverted_index = InvertedIndex(self.question_vectors_t)
+        return self._inverted_index
+
+@dataclass
+class CorpusSnapshot:
+    """One consistent view of the FAQs and the indexes built over them.
+
+    faqs is a columnar FaqStore and category_rows maps each category to the
+    rows of its entries.
+
+    Snapshots are never mutated once published; updates build a new one and
+    swap the reference, so a reader that grabbed a snapshot always sees FAQ
+    rows and matrix rows that line up.
+    """
+
+    faqs: object
+    category_rows: dict
+    tfidf_index: object
+    dense_index: object = None
+    # Rows added or changed since the last full TF-IDF fit, i.e. scored with stale IDF weights
+    stale_rows: int = 0
+    # Per-category sub-matrices, built on first use
+    _partitions: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def categories(self):
+        """Return the set of categories present in this snapshot."""
+        return set(self.category_rows)
+
+    def partition(self, category):
+        """Return the CategoryPartition for a category, or None if it has no FAQs."""
+        partition = self._partitions.get(category)
+        if partition is None:
+            rows = self.category_rows.get(category)
+            if rows is None:
+                return None
+            # Slicing the row-major matrix keeps global columns, so query vectors still apply
+            sub_matrix = self.tfidf_index.question_vectors[rows]
+            partition = self._partitions.setdefault(category, CategoryPartition(rows, sub_matrix.T.tocsr()))
+        return partition
+
+    def carry_partitions(self, previous, source_rows):
+        """Reuse the partitions of previous whose categories kept exactly the same FAQs.
+
+        source_rows maps each row of this snapshot to the row of previous it
+        was copied from, or -1 for a new row. Rows are positions, so a delete
+        shifts the rows after it; a reused partition keeps its sub-matrix and
+        inverted index under the renumbered rows. Only partitions of
+        categories that gained, lost or recategorized FAQs are built again.
+        Both snapshots must share vocabulary and IDF weights.
+        """
+        new_rows_of = np.full(len(previous.faqs), -1)
+        copied = source_rows >= 0
+        new_rows_of[source_rows[copied]] = np.flatnonzero(copied)
+        # Readers may be building partitions of previous concurrently
+        for category, partition in list(previous._partitions.items()):
+            rows = self.category_rows.get(category)
+            if rows is not None and np.array_equal(new_rows_of[partition.rows], rows):
+                self._partitions[category] = CategoryPartition(
+                    rows, partition.question_vectors_t, partition._inverted_index)
+        return self
+
+    @property
+    def generation(self):
+        """Cache generation for answers derived from this snapshot."""
+        return self.tfidf_index.content_hash
+
+@dataclass
+class FaqDiff:
+    """Entries added, updated and deleted between two versions of the corpus."""
+
+    added: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+
+    @property
+    def is_empty(self):
+        """Whether the two versions are identical."""
+        return not (self.added or self.updated or self.deleted)
+
+    @property
+    def upserts(self):
+        """Entries to insert or overwrite."""
+        return self.added + self.updated
+
+    def summary(self):
+        """Return the number of entries in each bucket."""
+        return {'added': len(self.added), 'updated': len(self.updated), 'deleted': len(self.deleted)}
+
+def diff_faqs(old_faqs, new_faqs):
+    """Compare two FAQ lists by question, returning what changed."""
+    old_by_key = {faq_key(faq): faq for faq in old_faqs}
+    new_by_key = {faq_key(faq): faq for faq in new_faqs}
+
+    diff = FaqDiff()
+    for key, faq in new_by_key.items():
+        previous = old_by_key.get(key)
+        if previous is None:
+            diff.added.append(faq)
+        elif faq_content(previous) != faq_content(faq):
+            diff.updated.append(faq)
+    diff.deleted = [key for key in old_by_key if key not in new_by_key]
+    return diff
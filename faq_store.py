@@ -0,0 +1,378 @@
+import os
+import csv
+import json
+import logging
+from array import array
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+DEFAULT_FAQ_PATH = os.environ.get('FAQ_PATH', 'faqs.json')
+DEFAULT_CATEGORY = 'General'
+
+# Formats recognised by file extension; anything else is sniffed from its first byte
+FORMATS_BY_EXTENSION = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'json', '.csv': 'csv'}
+
+READ_CHUNK_SIZE = 1 << 16
+MAX_REPORTED_ERRORS = 20
+
+class FaqValidationError(ValueError):
+    """Raised when an FAQ record does not match the expected schema."""
+
+def validate_record(record, position=None):
+    """Check one raw record and return it as a normalized FAQ dict."""
+    where = f" (record {position})" if position is not None else ""
+    if not isinstance(record, dict):
+        raise FaqValidationError(f"Expected an object, got {type(record).__name__}{where}")
+
+    normalized = {}
+    for field in ('question', 'answer'):
+        value = record.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise FaqValidationError(f"Missing or empty '{field}'{where}")
+        normalized[field] = value
+
+    category = record.get('category')
+    if category is None or (isinstance(category, str) and not category.strip()):
+        category = DEFAULT_CATEGORY
+    if not isinstance(category, str):
+        raise FaqValidationError(f"'category' must be a string{where}")
+
+    faq_id = record.get('id')
+    if faq_id not in (None, ''):
+        try:
+            faq_id = int(faq_id)
+        except (TypeError, ValueError):
+            raise FaqValidationError(f"'id' must be an integer{where}")
+    else:
+        faq_id = None
+
+    return {'category': category, 'question': normalized['question'], 'answer': normalized['answer'], 'id': faq_id}
+
+def detect_format(path):
+    """Guess the file format from its extension, or from its first non-blank byte."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in FORMATS_BY_EXTENSION:
+        return FORMATS_BY_EXTENSION[extension]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(1024).lstrip()
+    if head.startswith('['):
+        return 'json'
+    if head.startswith('{'):
+        return 'jsonl'
+    return 'csv'
+
+def _iter_jsonl(f):
+    """Yield one parsed record per non-blank line."""
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def _iter_json_array(f, chunk_size=READ_CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array, reading the file in chunks."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators between elements
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != '[':
+                    raise FaqValidationError("Expected a JSON array of FAQ records")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                record = None
+            if record is not None:
+                yield record
+                position = end
+                continue
+
+        if eof:
+            raise FaqValidationError("Unterminated JSON array")
+
+        # Need more input: drop consumed text and read the next chunk
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+def iter_records(path=DEFAULT_FAQ_PATH, format=None):
+    """Stream raw FAQ records from a JSON array, JSON Lines or CSV file."""
+    format = format or detect_format(path)
+    with open(path, 'r', encoding='utf-8', newline='' if format == 'csv' else None) as f:
+        if format == 'jsonl':
+            yield from _iter_jsonl(f)
+        elif format == 'json':
+            yield from _iter_json_array(f)
+        elif format == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            raise ValueError(f"Unknown FAQ file format: {format}")
+
+def iter_valid_records(records, strict=False):
+    """Validate records as they stream past, skipping (or raising on) bad ones."""
+    errors = 0
+    for position, record in enumerate(records):
+        try:
+            yield validate_record(record, position)
+        except FaqValidationError as e:
+            if strict:
+                raise
+            errors += 1
+            if errors <= MAX_REPORTED_ERRORS:
+                logger.warning(f"Skipping invalid FAQ: {e}")
+    if errors:
+        logger.warning(f"Skipped {errors} invalid FAQ records")
+
+def _take_strings(blob, offsets, rows):
+    """Gather the UTF-8 strings at rows into a new (blob, offsets) pair."""
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+
+    if len(rows) == 0:
+        return blob[:0].copy(), new_offsets
+
+    # Copy each run of consecutive rows as one slice; patches leave few runs
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    run_starts = np.concatenate([[0], breaks])
+    run_ends = np.concatenate([breaks, [len(rows)]])
+    pieces = [blob[offsets[rows[first]]:offsets[rows[last - 1] + 1]] for first, last in zip(run_starts, run_ends)]
+    return np.concatenate(pieces), new_offsets
+
+class FaqStoreBuilder:
+    """Accumulates validated records into columnar buffers one at a time."""
+
+    def __init__(self):
+        """Start with empty columns."""
+        self._questions = bytearray()
+        self._answers = bytearray()
+        self._question_offsets = array('q', [0])
+        self._answer_offsets = array('q', [0])
+        self._category_codes = array('i')
+        self._ids = array('q')
+        self.category_names = []
+        self._category_lookup = {}
+
+    def append(self, record):
+        """Add one validated record."""
+        self._questions += record['question'].encode('utf-8')
+        self._question_offsets.append(len(self._questions))
+        self._answers += record['answer'].encode('utf-8')
+        self._answer_offsets.append(len(self._answers))
+
+        # Each category name is stored once and referenced by a small integer
+        category = record.get('category') or DEFAULT_CATEGORY
+        code = self._category_lookup.get(category)
+        if code is None:
+            code = self._category_lookup[category] = len(self.category_names)
+            self.category_names.append(category)
+        self._category_codes.append(code)
+
+        faq_id = record.get('id')
+        self._ids.append(-1 if faq_id is None else faq_id)
+
+    def build(self):
+        """Freeze the buffers into an FaqStore, assigning ids where none were given."""
+        ids = np.frombuffer(self._ids, dtype=np.int64).copy() if len(self._ids) else np.zeros(0, dtype=np.int64)
+        missing = ids < 0
+        if missing.any():
+            next_id = int(ids.max()) + 1 if (~missing).any() else 0
+            ids[missing] = np.arange(next_id, next_id + int(missing.sum()))
+
+        return FaqStore(
+            np.frombuffer(bytes(self._questions), dtype=np.uint8),
+            np.frombuffer(self._question_offsets, dtype=np.int64).copy(),
+            np.frombuffer(bytes(self._answers), dtype=np.uint8),
+            np.frombuffer(self._answer_offsets, dtype=np.int64).copy(),
+            np.frombuffer(self._category_codes, dtype=np.int32).copy() if len(self._category_codes) else np.zeros(0, dtype=np.int32),
+            list(self.category_names),
+            ids
+        )
+
+class FaqStore:
+    """Read-only columnar FAQ storage.
+
+    Questions and answers live in two UTF-8 byte blobs addressed by offset
+    arrays, categories are interned to int32 codes, and each row has an
+    integer id. Indexing a row decodes it into the usual
+    {'category', 'question', 'answer'} dict on demand, so callers that treat
+    the corpus as a list of dicts keep working.
+    """
+
+    def __init__(self, question_blob, question_offsets, answer_blob, answer_offsets,
+                 category_codes, category_names, ids, question_hashes=None):
+        """Wrap already built column arrays."""
+        self._question_blob = question_blob
+        self._question_offsets = question_offsets
+        self._answer_blob = answer_blob
+        self._answer_offsets = answer_offsets
+        self.category_codes = category_codes
+        self.category_names = category_names
+        self.ids = ids
+
+        # Hashes of stripped questions find rows by key without a per-row dict
+        if question_hashes is None:
+            question_hashes = np.fromiter(
+                (hash(question.strip()) for question in self.iter_questions()),
+                dtype=np.int64,
+                count=len(ids)
+            )
+        self._question_hashes = question_hashes
+
+    @classmethod
+    def from_records(cls, records, strict=False):
+        """Build a store from an iterable of raw records, validating each one."""
+        builder = FaqStoreBuilder()
+        for record in iter_valid_records(records, strict=strict):
+            builder.append(record)
+        return builder.build()
+
+    def __len__(self):
+        """Number of FAQ rows."""
+        return len(self.ids)
+
+    def __getitem__(self, row):
+        """Decode one row into an FAQ dict."""
+        row = int(row)
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return {'category': self.category(row), 'question': self.question(row), 'answer': self.answer(row)}
+
+    def __iter__(self):
+        """Decode rows one at a time."""
+        for row in range(len(self)):
+            yield self[row]
+
+    def question(self, row):
+        """Return the question text of a row."""
+        start, end = self._question_offsets[row], self._question_offsets[row + 1]
+        return self._question_blob[start:end].tobytes().decode('utf-8')
+
+    def answer(self, row):
+        """Return the answer text of a row."""
+        start, end = self._answer_offsets[row], self._answer_offsets[row + 1]
+        return self._answer_blob[start:end].tobytes().decode('utf-8')
+
+    def category(self, row):
+        """Return the category name of a row."""
+        return self.category_names[self.category_codes[row]]
+
+    def iter_questions(self):
+        """Yield every question in row order without building a list."""
+        blob, offsets = self._question_blob, self._question_offsets
+        for row in range(len(offsets) - 1):
+            yield blob[offsets[row]:offsets[row + 1]].tobytes().decode('utf-8')
+
+    def rows_for_questions(self, questions):
+        """Return {stripped question: [rows]} for the questions present in the store."""
+        wanted = {question.strip() for question in questions}
+        hashes = np.array([hash(question) for question in wanted], dtype=np.int64)
+        found = {}
+        for row in np.flatnonzero(np.isin(self._question_hashes, hashes)):
+            # Confirm against the text, since hashes can collide
+            question = self.question(row).strip()
+            if question in wanted:
+                found.setdefault(question, []).append(int(row))
+        return found
+
+    def category_rows(self):
+        """Return {category name: int32 array of rows}, in row order within each category."""
+        order = np.argsort(self.category_codes, kind='stable')
+        counts = np.bincount(self.category_codes, minlength=len(self.category_names))
+        rows = {}
+        offset = 0
+        for code, count in enumerate(counts):
+            if count:
+                rows[self.category_names[code]] = order[offset:offset + count].astype(np.int32)
+            offset += count
+        return rows
+
+    def with_rows(self, source_rows, new_records):
+        """Return a new store laid out by source_rows.
+
+        Each entry of source_rows is either a row of this store to copy or -1
+        for the next record in new_records. Copied rows are gathered with
+        vectorized slicing rather than decoded.
+        """
+        source_rows = np.asarray(source_rows, dtype=np.int64)
+        fresh = source_rows < 0
+        copied = source_rows[~fresh]
+
+        # Append the new records to a copy of the kept rows, then reorder
+        builder = FaqStoreBuilder()
+        builder.category_names = list(self.category_names)
+        builder._category_lookup = {name: code for code, name in enumerate(self.category_names)}
+        next_id = int(self.ids.max()) + 1 if len(self.ids) else 0
+        for record in new_records:
+            record = validate_record(record)
+            if record['id'] is None:
+                record['id'] = next_id
+                next_id += 1
+            builder.append(record)
+        added = builder.build()
+
+        questions, question_offsets = _take_strings(self._question_blob, self._question_offsets, copied)
+        answers, answer_offsets = _take_strings(self._answer_blob, self._answer_offsets, copied)
+        stacked = FaqStore(
+            np.concatenate([questions, added._question_blob]),
+            np.concatenate([question_offsets, question_offsets[-1] + added._question_offsets[1:]]),
+            np.concatenate([answers, added._answer_blob]),
+            np.concatenate([answer_offsets, answer_offsets[-1] + added._answer_offsets[1:]]),
+            np.concatenate([self.category_codes[copied], added.category_codes]).astype(np.int32),
+            added.category_names,
+            np.concatenate([self.ids[copied], added.ids]),
+            np.concatenate([self._question_hashes[copied], added._question_hashes])
+        )
+
+        order = np.empty(len(source_rows), dtype=np.int64)
+        order[~fresh] = np.arange(len(copied))
+        order[fresh] = len(copied) + np.arange(int(fresh.sum()))
+        return stacked.take(order)
+
+    def take(self, rows):
+        """Return a new store holding only the given rows, in that order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == len(self) and np.array_equal(rows, np.arange(len(self))):
+            return self
+        questions, question_offsets = _take_strings(self._question_blob, self._question_offsets, rows)
+        answers, answer_offsets = _take_strings(self._answer_blob, self._answer_offsets, rows)
+        return FaqStore(
+            questions, question_offsets, answers, answer_offsets,
+            self.category_codes[rows], self.category_names, self.ids[rows], self._question_hashes[rows]
+        )
+
+    def nbytes(self):
+        """Approximate memory held by the column arrays."""
+        return sum(column.nbytes for column in (
+            self._question_blob, self._question_offsets, self._answer_blob, self._answer_offsets,
+            self.category_codes, self.ids, self._question_hashes
+        ))
+
+def load(path=DEFAULT_FAQ_PATH, format=None, strict=False):
+    """Stream, validate and pack an FAQ file into an FaqStore."""
+    store = FaqStore.from_records(iter_records(path, format), strict=strict)
+    logger.info(f"Loaded {len(store)} FAQs from {path} into {store.nbytes() / 1024:.0f} KiB of columns")
+    return store
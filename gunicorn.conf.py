@@ -0,0 +1,42 @@
+import gc
+import os
+import logging
+import multiprocessing
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Pre-fork JSON API server: gunicorn main:app picks this file up automatically
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+# Streaming responses hold a connection for a whole answer
+keepalive = 5
+
+# Import the app, and with it build the FAQ index, once in the master;
+# workers inherit it through copy-on-write memory instead of rebuilding it
+preload_app = True
+
+def when_ready(server):
+    """Warm the shared service in the master, then freeze it for copy-on-write sharing."""
+    from service_registry import registry
+
+    registry.warm_up()
+    registry.before_fork()
+
+    # Move everything allocated so far out of the collector's reach; otherwise
+    # the first collection in each worker writes to every object header and
+    # copies the master's pages one by one
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Master ready with {gc.get_freeze_count()} objects frozen for the workers")
+
+def post_fork(server, worker):
+    """Reopen connections and restart the threads a fork does not carry over, in each new worker."""
+    from service_registry import registry
+    from api import FAQ_WATCH_INTERVAL
+
+    registry.after_fork(FAQ_WATCH_INTERVAL)
+    logger.info(f"Worker {worker.pid} ready")
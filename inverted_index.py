@@ -0,0 +1,112 @@
+import numpy as np
+
+# Pruning margin, so rounding in the bounds never drops an FAQ that exhaustive scoring ranks in
+PRUNING_SLACK = 1e-9
+
+class InvertedIndex:
+    """Term to posting-list view of a term-major TF-IDF matrix, with MaxScore top-k.
+
+    Row t of the term-major CSR matrix already is the posting list of term t:
+    the FAQ ids containing it (sorted) and their L2-normalized weights. The
+    index adds each term's maximum weight, which bounds how much that term can
+    add to any FAQ's cosine score, so scoring can stop admitting new
+    candidates once the remaining terms cannot lift one into the top k.
+    """
+
+    def __init__(self, question_vectors_t):
+        """Wrap a term-major CSR matrix and precompute per-term score bounds."""
+        if not question_vectors_t.has_sorted_indices:
+            question_vectors_t = question_vectors_t.copy()
+            question_vectors_t.sort_indices()
+        self.postings = question_vectors_t
+        self.n_documents = question_vectors_t.shape[1]
+
+        # Largest weight in each posting list; empty lists bound to zero
+        indptr = np.asarray(question_vectors_t.indptr)
+        data = np.asarray(question_vectors_t.data)
+        self.max_weights = np.zeros(question_vectors_t.shape[0], dtype=np.float64)
+        non_empty = np.flatnonzero(np.diff(indptr))
+        if len(non_empty):
+            self.max_weights[non_empty] = np.maximum.reduceat(data, indptr[non_empty])
+
+    def posting(self, term):
+        """Return (FAQ ids, weights) for one term."""
+        start, end = self.postings.indptr[term], self.postings.indptr[term + 1]
+        return self.postings.indices[start:end], self.postings.data[start:end]
+
+    def top_k(self, query_vector, k):
+        """Return the k best (FAQ ids, scores), best first, touching only matching postings.
+
+        Terms are visited in order of decreasing score bound. Once the bounds
+        of the unvisited terms sum to less than the current k-th best score,
+        no unseen FAQ can reach the top k, so the remaining posting lists are
+        only probed for FAQs already collected (MaxScore). The surviving
+        candidates are then rescored in the same summation order as
+        exhaustive scoring, so ids and scores match it bit for bit, and equal
+        scores rank the lower FAQ id first, as argmax does.
+        """
+        k = min(k, self.n_documents)
+        if k <= 0:
+            return np.zeros(0, dtype=np.intp), np.zeros(0)
+
+        query_vector = query_vector.tocsr()
+        if not query_vector.has_sorted_indices:
+            query_vector = query_vector.copy()
+            query_vector.sort_indices()
+        terms = query_vector.indices
+        bounds = query_vector.data * self.max_weights[terms]
+        order = np.argsort(-bounds, kind='stable')
+        terms, weights, bounds = terms[order], query_vector.data[order], bounds[order]
+        # remaining[i] bounds what terms i onwards can add to any single FAQ
+        remaining = np.concatenate([np.cumsum(bounds[::-1])[::-1], [0.0]])
+
+        ids = np.zeros(0, dtype=np.intp)
+        scores = np.zeros(0)
+        for i, (term, weight) in enumerate(zip(terms, weights)):
+            docs, posting_weights = self.posting(term)
+            if len(docs) == 0:
+                continue
+            contributions = posting_weights * weight
+
+            if len(scores) >= k:
+                threshold = np.partition(scores, len(scores) - k)[len(scores) - k] - PRUNING_SLACK
+            else:
+                threshold = -np.inf
+            if remaining[i] < threshold:
+                # Unseen FAQs can score at most remaining[i]; drop hopeless candidates too
+                alive = scores + remaining[i] >= threshold
+                ids, scores = ids[alive], scores[alive]
+
+                positions = np.minimum(np.searchsorted(docs, ids), len(docs) - 1)
+                hits = docs[positions] == ids
+                scores[hits] += contributions[positions[hits]]
+            elif len(ids) == 0:
+                ids, scores = docs.astype(np.intp), contributions.astype(np.float64)
+            else:
+                # Both id lists are sorted, so merge by position instead of re-sorting
+                positions = np.searchsorted(ids, docs)
+                clipped = np.minimum(positions, len(ids) - 1)
+                hits = ids[clipped] == docs
+                scores[clipped[hits]] += contributions[hits]
+                ids = np.insert(ids, positions[~hits], docs[~hits])
+                scores = np.insert(scores, positions[~hits], contributions[~hits])
+
+        if len(ids) < k:
+            # Pad with zero-score FAQs, as exhaustive scoring would rank them
+            padding = np.setdiff1d(np.arange(min(self.n_documents, len(ids) + k)), ids)[:k - len(ids)]
+            ids = np.concatenate([ids, padding])
+            scores = np.concatenate([scores, np.zeros(len(padding))])
+
+        # Rescore summing in ascending term order, as the exhaustive sparse product does
+        scores = np.zeros(len(ids))
+        for term, weight in zip(query_vector.indices, query_vector.data):
+            docs, posting_weights = self.posting(term)
+            if len(docs) == 0:
+                continue
+            positions = np.minimum(np.searchsorted(docs, ids), len(docs) - 1)
+            hits = docs[positions] == ids
+            scores[hits] += weight * posting_weights[positions[hits]]
+
+        # Candidates are few, so a full sort is cheap; ties go to the lower id, like argmax
+        best = np.lexsort((ids, -scores))[:k]
+        return ids[best], scores[best]
@@ -0,0 +1,92 @@
+import time
+import threading
+from contextlib import contextmanager
+from collections import deque
+import numpy as np
+
+DEFAULT_WINDOW = 1000
+
+class LatencyTracker:
+    """Thread-safe rolling window of latency samples grouped by metric name."""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        """Keep at most window recent samples per metric."""
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, milliseconds):
+        """Record one latency sample in milliseconds."""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(milliseconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def summary(self):
+        """Return count, mean and tail percentiles for every metric."""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+
+        report = {}
+        for name, samples in snapshot.items():
+            values = np.asarray(samples)
+            report[name] = {
+                'count': counts[name],
+                'mean_ms': float(values.mean()),
+                'p50_ms': float(np.percentile(values, 50)),
+                'p95_ms': float(np.percentile(values, 95)),
+                'p99_ms': float(np.percentile(values, 99)),
+            }
+        return report
+
+class StartupProfile:
+    """Wall-clock time spent in each named startup phase, in the order first seen."""
+
+    def __init__(self, clock=time.perf_counter):
+        """Start the readiness clock now."""
+        self.clock = clock
+        self.started = clock()
+        self.ready_at = None
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as one startup phase; repeated phases accumulate."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            elapsed_ms = (self.clock() - start) * 1000
+            with self._lock:
+                self._phases[name] = self._phases.get(name, 0.0) + elapsed_ms
+
+    def mark_ready(self):
+        """Record the moment the process could first serve requests."""
+        with self._lock:
+            if self.ready_at is None:
+                self.ready_at = self.clock()
+
+    def report(self):
+        """Return per-phase milliseconds and, once ready, the time to readiness."""
+        with self._lock:
+            phases = dict(self._phases)
+            ready_at = self.ready_at
+        return {
+            'phases_ms': phases,
+            'ready_ms': (ready_at - self.started) * 1000 if ready_at is not None else None,
+        }
+
+    def format(self):
+        """Return the report as one log-friendly line."""
+        report = self.report()
+        phases = ', '.join(f"{name} {ms:.0f} ms" for name, ms in report['phases_ms'].items())
+        ready = f"{report['ready_ms']:.0f} ms" if report['ready_ms'] is not None else 'not ready'
+        return f"Startup {ready}: {phases}"
+
+# Process-wide profile, started when this module is first imported
+startup_profile = StartupProfile()
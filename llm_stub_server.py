@@ -0,0 +1,186 @@
+import sys
+import json
+import time
+import random
+import argparse
+import logging
+import threading
+import itertools
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLY = "Welcome to the Matrix. This is a canned answer from the local completion stub. AURORA"
+
+class StubConfig:
+    """Behaviour knobs for the stub completion server."""
+
+    def __init__(self, delay=0.0, reply=DEFAULT_REPLY, token_delay=0.0, error_rate=0.0, error_status=500,
+                 slow_rate=0.0, slow_delay=5.0, seed=None):
+        """Set the artificial latencies, injected faults and the canned reply text.
+
+        A share error_rate of requests fails with error_status, and a share
+        slow_rate of the rest waits an extra slow_delay seconds.
+        """
+        self.delay = delay
+        self.token_delay = token_delay
+        self.reply = reply
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.requests = 0
+        self.errors_injected = 0
+        self.slow_injected = 0
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def draw_fault(self):
+        """Pick the fault for one request: 'error', 'slow' or None."""
+        with self._lock:
+            roll = self._random.random()
+            if roll < self.error_rate:
+                self.errors_injected += 1
+                return 'error'
+            if roll < self.error_rate + self.slow_rate:
+                self.slow_injected += 1
+                return 'slow'
+            return None
+
+    def next_id(self):
+        """Count a request and return its completion id."""
+        with self._lock:
+            self.requests += 1
+            return f"chatcmpl-stub-{next(self._ids)}"
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the OpenAI chat completions endpoint."""
+
+    protocol_version = 'HTTP/1.1'
+    config = StubConfig()
+
+    def log_message(self, format, *args):
+        """Route access logs through the module logger at debug level."""
+        logger.debug(format % args)
+
+    def _send_json(self, status, payload):
+        """Write a JSON response with a content length so connections stay pooled."""
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_reply(self, completion_id, model):
+        """Send the reply as server-sent event chunks, one word at a time."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None):
+            return {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            }
+
+        words = self.config.reply.split(' ')
+        events = [event({'role': 'assistant', 'content': ''})]
+        events += [event({'content': word if i == 0 else ' ' + word}) for i, word in enumerate(words)]
+        events.append(event({}, 'stop'))
+
+        for payload in events:
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            if self.config.token_delay:
+                time.sleep(self.config.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        """Answer chat completion requests with a canned reply after a delay."""
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+            return
+
+        completion_id = self.config.next_id()
+        fault = self.config.draw_fault()
+        if self.config.delay:
+            time.sleep(self.config.delay)
+        if fault == 'error':
+            self._send_json(self.config.error_status, {'error': {'message': "Injected fault", 'type': 'server_error'}})
+            return
+        if fault == 'slow':
+            time.sleep(self.config.slow_delay)
+
+        if request.get('stream'):
+            self._stream_reply(completion_id, request.get('model', 'stub'))
+            return
+
+        self._send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': self.config.reply},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        })
+
+def start_server(host='127.0.0.1', port=0, config=None):
+    """Start the stub in a background thread and return (server, base_url)."""
+    handler = type('ConfiguredStubHandler', (StubHandler,), {'config': config or StubConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1"
+    logger.info(f"Stub completion server listening at {base_url}")
+    return server, base_url
+
+def main(argv=None):
+    """Run the stub completion server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local stub for the chat completions API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with an error")
+    parser.add_argument('--error-status', type=int, default=500, help="HTTP status of injected errors")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="share of requests delayed by --slow-delay")
+    parser.add_argument('--slow-delay', type=float, default=5.0, help="extra seconds for slow requests")
+    parser.add_argument('--seed', type=int, default=None, help="seed for reproducible fault injection")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    config = StubConfig(
+        delay=args.delay,
+        token_delay=args.token_delay,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        slow_rate=args.slow_rate,
+        slow_delay=args.slow_delay,
+        seed=args.seed
+    )
+    server, base_url = start_server(args.host, args.port, config)
+    print(f"Point OPENAI_BASE_URL at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
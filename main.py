@@ -1,4 +1,6 @@
-from app import app
+import os
+from api import app
 
+# Production serving: gunicorn main:app, configured by gunicorn.conf.py
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', '5000')), debug=os.environ.get('FLASK_DEBUG', '0') == '1')
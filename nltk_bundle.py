@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import zipfile
+import tempfile
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Bump when the bundle layout changes
+BUNDLE_VERSION = 1
+
+# NLTK packages the service needs, by their path inside an NLTK data directory
+BUNDLE_RESOURCES = {
+    'stopwords': 'corpora/stopwords.zip',
+    'wordnet': 'corpora/wordnet.zip',
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+}
+
+DEFAULT_BUNDLE_DIR = os.environ.get('NLTK_BUNDLE_DIR', 'nltk_bundle')
+
+# Never call nltk.download at runtime, even when no bundle is present
+OFFLINE = os.environ.get('NLTK_OFFLINE', '0') == '1'
+
+# Checksums can be skipped on trusted read-only images to save a few milliseconds
+VERIFY_CHECKSUMS = os.environ.get('NLTK_BUNDLE_VERIFY', '1') == '1'
+
+MANIFEST_NAME = 'manifest.json'
+
+class BundleError(RuntimeError):
+    """The NLTK bundle is missing, incomplete or fails its checksums."""
+
+def _sha256(path):
+    """Return the hex SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def available(bundle_dir=DEFAULT_BUNDLE_DIR):
+    """Whether a bundle has been built at bundle_dir."""
+    return os.path.exists(os.path.join(bundle_dir, MANIFEST_NAME))
+
+def verify(bundle_dir=DEFAULT_BUNDLE_DIR, checksums=True):
+    """Check that every bundled resource is present and unmodified; return the manifest."""
+    manifest_path = os.path.join(bundle_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise BundleError(f"Cannot read NLTK bundle manifest at {manifest_path}: {e}")
+
+    if manifest.get('bundle_version') != BUNDLE_VERSION:
+        raise BundleError(f"NLTK bundle at {bundle_dir} has version {manifest.get('bundle_version')}, "
+                          f"expected {BUNDLE_VERSION}")
+
+    resources = manifest.get('resources', {})
+    for package in BUNDLE_RESOURCES:
+        entry = resources.get(package)
+        if entry is None:
+            raise BundleError(f"NLTK bundle at {bundle_dir} is missing {package}")
+        path = os.path.join(bundle_dir, entry['path'])
+        if not os.path.exists(path) or os.path.getsize(path) != entry['bytes']:
+            raise BundleError(f"NLTK bundle file {path} is missing or truncated")
+        if checksums and _sha256(path) != entry['sha256']:
+            raise BundleError(f"NLTK bundle file {path} fails its checksum")
+    return manifest
+
+def install(bundle_dir=DEFAULT_BUNDLE_DIR, checksums=VERIFY_CHECKSUMS):
+    """Verify the bundle and put it first on the NLTK data path, without importing nltk.
+
+    nltk reads NLTK_DATA when it is first imported, so setting the variable
+    is enough when the import is still pending; an already imported nltk is
+    patched directly.
+    """
+    verify(bundle_dir, checksums)
+    bundle_dir = os.path.abspath(bundle_dir)
+
+    paths = [path for path in os.environ.get('NLTK_DATA', '').split(os.pathsep) if path]
+    if bundle_dir not in paths:
+        os.environ['NLTK_DATA'] = os.pathsep.join([bundle_dir] + paths)
+
+    nltk_data = sys.modules.get('nltk.data')
+    if nltk_data is not None and bundle_dir not in nltk_data.path:
+        nltk_data.path.insert(0, bundle_dir)
+    logger.debug(f"Using offline NLTK bundle at {bundle_dir}")
+    return bundle_dir
+
+def read_member(package, member, bundle_dir=DEFAULT_BUNDLE_DIR):
+    """Read one file out of a bundled package zip as text."""
+    with zipfile.ZipFile(os.path.join(bundle_dir, BUNDLE_RESOURCES[package])) as archive:
+        return archive.read(member).decode('utf-8')
+
+def stopwords(language='english', bundle_dir=DEFAULT_BUNDLE_DIR):
+    """Return NLTK's stopword list straight from the bundle, without importing nltk."""
+    return read_member('stopwords', f'stopwords/{language}', bundle_dir).split()
+
+def unzipped_name(resource):
+    """Return a package's directory name, which nltk.data.find resolves to either its zip or its unzipped copy."""
+    return (resource[:-len('.zip')] if resource.endswith('.zip') else resource) + '/'
+
+def _copy_package(pointer, target):
+    """Write an installed NLTK package to target as a zip, whether it is installed zipped or unzipped."""
+    zip_file = getattr(pointer, 'zipfile', None)
+    if zip_file is not None:
+        shutil.copyfile(zip_file.filename, target)
+        return
+
+    # Unzipped install: archive the directory with the same layout as NLTK's own zips
+    root = os.path.dirname(pointer.path.rstrip(os.sep))
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for dirpath, dirnames, filenames in os.walk(pointer.path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                archive.write(path, os.path.relpath(path, root))
+
+def build(bundle_dir=DEFAULT_BUNDLE_DIR):
+    """Collect the required NLTK packages into a checksummed bundle, downloading if needed.
+
+    This is the only place that touches the network; run it at image build
+    time and ship the resulting directory with the service.
+    """
+    import nltk
+
+    os.makedirs(os.path.dirname(os.path.abspath(bundle_dir)), exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix='.nltk-bundle-', dir=os.path.dirname(os.path.abspath(bundle_dir)))
+    download_dir = os.path.join(tmp_path, '.download')
+    try:
+        resources = {}
+        for package, resource in BUNDLE_RESOURCES.items():
+            target = os.path.join(tmp_path, resource)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                _copy_package(nltk.data.find(unzipped_name(resource)), target)
+            except LookupError:
+                logger.info(f"Downloading NLTK package: {package}")
+                if not nltk.download(package, download_dir=download_dir, quiet=True):
+                    raise BundleError(f"Could not download NLTK package {package}")
+                shutil.copyfile(os.path.join(download_dir, resource), target)
+            resources[package] = {'path': resource, 'sha256': _sha256(target), 'bytes': os.path.getsize(target)}
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+        manifest = {'bundle_version': BUNDLE_VERSION, 'nltk_version': nltk.__version__, 'resources': resources}
+        with open(os.path.join(tmp_path, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Replace any previous bundle in one step
+        if os.path.isdir(bundle_dir):
+            shutil.rmtree(bundle_dir)
+        os.rename(tmp_path, bundle_dir)
+        logger.info(f"Built NLTK bundle at {bundle_dir}")
+        return bundle_dir
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+def main(argv=None):
+    """Build or verify the offline NLTK bundle: nltk_bundle.py [build|verify] [dir]."""
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else 'build'
+    bundle_dir = argv[1] if len(argv) > 1 else DEFAULT_BUNDLE_DIR
+
+    if command == 'build':
+        build(bundle_dir)
+    elif command == 'verify':
+        verify(bundle_dir)
+        logger.info(f"NLTK bundle at {bundle_dir} is intact")
+    else:
+        raise SystemExit(f"Unknown command: {command}")
+
+if __name__ == "__main__":
+    main()
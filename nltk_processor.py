@@ -1,59 +1,175 @@
 import os
-import json
-import re
+import time
 import logging
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from nltk.sentiment import SentimentIntensityAnalyzer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import threading
+import numpy as np
+import tfidf_index
+import nltk_bundle
+from text_normalizer import TextNormalizer
+from sentiment_analyzer import NEUTRAL_SCORES, SentimentAnalyzer
+from retrieval import RetrievalResult, fuse_scores, score_queries, top_k_indices, top_k_indices_batch
+import faq_store
+from faq_corpus import CorpusSnapshot, diff_faqs, faq_key, next_generation
+from latency_metrics import startup_profile
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+FAQS_PATH = faq_store.DEFAULT_FAQ_PATH
+
+# Upper bound on query x FAQ scores materialized at once by batch matching
+MAX_BATCH_SCORES = 1 << 24
+
+# From this many FAQs in scope, single TF-IDF queries use inverted-index
+# MaxScore top-k instead of scoring every FAQ
+PRUNED_SCORING_MIN_DOCUMENTS = 1000
+
+# Retriever backends: lexical TF-IDF, dense embeddings, or a fusion of both
+RETRIEVER_BACKENDS = ('tfidf', 'dense', 'hybrid')
+DEFAULT_RETRIEVER = os.environ.get('RETRIEVER_BACKEND', 'tfidf')
+DEFAULT_DENSE_WEIGHT = float(os.environ.get('HYBRID_DENSE_WEIGHT', '0.5'))
+
+# Seconds between background TF-IDF refits while incremental updates are pending
+DEFAULT_REFIT_INTERVAL = float(os.environ.get('TFIDF_REFIT_INTERVAL', '300'))
+
 class NLTKProcessor:
-    def __init__(self):
-        """Initialize NLTK processor with necessary downloads and load FAQs."""
-        # Download required NLTK packages if not already present
+    def __init__(self, index_dir=None, retriever=None, dense_weight=DEFAULT_DENSE_WEIGHT,
+                 refit_interval=DEFAULT_REFIT_INTERVAL):
+        """Initialize NLTK processor with its NLTK resources and load FAQs."""
         try:
-            self._download_nltk_dependencies()
+            # Use the offline bundle, or download required NLTK packages if not already present
+            with startup_profile.phase('nltk_resources'):
+                self._download_nltk_dependencies()
             
             # Load and prepare FAQs
-            self.load_faqs()
-            
-            # Initialize NLTK tools
-            self.lemmatizer = WordNetLemmatizer()
-            self.sia = SentimentIntensityAnalyzer()
-            
-            # Create TF-IDF vectorizer for question matching
-            self.vectorizer = TfidfVectorizer(
-                tokenizer=self.preprocess_text,
-                stop_words='english'
-            )
-            
-            # Prepare FAQ corpus for vectorization
-            questions = [faq['question'] for faq in self.faqs]
-            self.question_vectors = self.vectorizer.fit_transform(questions)
+            with startup_profile.phase('load_faqs'):
+                faqs = self.load_faqs()
+            
+            # VADER's lexicon is only loaded once sentiment is first requested
+            self.sentiment = SentimentAnalyzer()
+            
+            # Build the stopword set and lemma cache once for every query
+            with startup_profile.phase('text_normalizer'):
+                self.normalizer = TextNormalizer()
+            
+            # Load the persisted TF-IDF index, refitting only if the FAQ file changed
+            with startup_profile.phase('tfidf_index'):
+                index = tfidf_index.load_or_build(
+                    FAQS_PATH,
+                    faqs.iter_questions(),
+                    self.preprocess_text,
+                    index_dir=index_dir or tfidf_index.DEFAULT_INDEX_DIR
+                )
+            
+            # Optionally load the dense embedding index alongside TF-IDF
+            self.dense_weight = dense_weight
+            with startup_profile.phase('dense_index'):
+                self.retriever, dense = self._init_dense_retriever(
+                    retriever or DEFAULT_RETRIEVER,
+                    faqs,
+                    index_dir or tfidf_index.DEFAULT_INDEX_DIR
+                )
+            
+            # Readers grab this reference once per call; updates replace it whole
+            self._snapshot = CorpusSnapshot(faqs, faqs.category_rows(), index, dense)
+            self._write_lock = threading.Lock()
+            self._refit_lock = threading.Lock()
+            self.refit_interval = refit_interval
+            self._refit_thread = None
+            self._refit_stop = threading.Event()
+            
+            # Import nltk and load WordNet off the startup path
+            self._warm_up_thread = threading.Thread(target=self.warm_up, name='nltk-warm-up', daemon=True)
+            self._warm_up_thread.start()
             
             logger.info("NLTK processor initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing NLTK processor: {e}")
             raise
     
+    def _init_dense_retriever(self, retriever, faqs, index_dir):
+        """Load the dense index for dense/hybrid retrieval, falling back to TF-IDF."""
+        if retriever not in RETRIEVER_BACKENDS:
+            raise ValueError(f"Unknown retriever backend: {retriever}")
+        if retriever == 'tfidf':
+            return retriever, None
+        
+        try:
+            import dense_index
+            dense = dense_index.load_or_build(FAQS_PATH, faqs.iter_questions(), index_dir=index_dir)
+            logger.info(f"Using {retriever} retrieval with a {dense.backend} dense index")
+            return retriever, dense
+        except ImportError as e:
+            logger.warning(f"Dense retrieval unavailable ({e}), using TF-IDF only")
+            return 'tfidf', None
+        except Exception as e:
+            # e.g. the embedding model could not be downloaded or loaded
+            logger.error(f"Error loading dense index, using TF-IDF only: {e}")
+            return 'tfidf', None
+    
+    @property
+    def snapshot(self):
+        """The current consistent view of FAQs and indexes."""
+        return self._snapshot
+    
+    @property
+    def faqs(self):
+        """FAQ entries in the current snapshot."""
+        return self._snapshot.faqs
+    
+    @property
+    def category_rows(self):
+        """Rows of each category in the current snapshot."""
+        return self._snapshot.category_rows
+    
+    @property
+    def categories(self):
+        """Categories present in the current snapshot."""
+        return self._snapshot.categories
+    
+    @property
+    def tfidf_index(self):
+        """TF-IDF index of the current snapshot."""
+        return self._snapshot.tfidf_index
+    
+    @property
+    def vectorizer(self):
+        """Fitted vectorizer of the current TF-IDF index."""
+        return self._snapshot.tfidf_index.vectorizer
+    
+    @property
+    def question_vectors(self):
+        """Question matrix of the current TF-IDF index."""
+        return self._snapshot.tfidf_index.question_vectors
+    
+    @property
+    def dense_index(self):
+        """Dense index of the current snapshot, if any."""
+        return self._snapshot.dense_index
+    
     def _download_nltk_dependencies(self):
-        """Download necessary NLTK data."""
+        """Make NLTK data available, from the offline bundle when one has been built.
+        
+        With a bundle, or with NLTK_OFFLINE=1, nothing is ever downloaded.
+        """
         try:
+            if nltk_bundle.available():
+                nltk_bundle.install()
+                return
+            if nltk_bundle.OFFLINE:
+                logger.warning("NLTK_OFFLINE is set but no bundle was found, relying on installed NLTK data")
+                return
+            
+            import nltk
             nltk_data_path = os.environ.get('NLTK_DATA', os.path.expanduser('~/nltk_data'))
             os.makedirs(nltk_data_path, exist_ok=True)
             nltk.data.path.append(nltk_data_path)
             
             # Download required NLTK packages
-            for package in ['punkt', 'wordnet', 'stopwords', 'vader_lexicon']:
+            for package, resource in nltk_bundle.BUNDLE_RESOURCES.items():
                 try:
-                    nltk.data.find(f'tokenizers/{package}' if package == 'punkt' else package)
+                    nltk.data.find(nltk_bundle.unzipped_name(resource))
                     logger.debug(f"NLTK package {package} already downloaded")
                 except LookupError:
                     logger.info(f"Downloading NLTK package: {package}")
@@ -61,29 +177,25 @@ class NLTKProcessor:
         except Exception as e:
             logger.error(f"Error downloading NLTK dependencies: {e}")
             raise
-            
-    def load_faqs(self):
-        """Load FAQs from JSON file."""
+    
+    @property
+    def lemmatizer(self):
+        """The WordNet lemmatizer, loaded on first use."""
+        return self.normalizer.lemmatizer
+    
+    def warm_up(self):
+        """Load the lazily imported NLTK resources that queries need."""
         try:
-            with open('faqs.json', 'r') as f:
-                self.faqs = json.load(f)
-            logger.info(f"Loaded {len(self.faqs)} FAQs")
-            
-            # Create a dictionary to store FAQs by category
-            self.faqs_by_category = {}
-            self.categories = set()
-            
-            for faq in self.faqs:
-                category = faq.get('category', 'General')
-                self.categories.add(category)
-                
-                if category not in self.faqs_by_category:
-                    self.faqs_by_category[category] = []
-                
-                self.faqs_by_category[category].append(faq)
-            
-            logger.info(f"Organized FAQs into {len(self.categories)} categories")
-            
+            with startup_profile.phase('nltk_warm_up'):
+                self.normalizer.warm_up()
+            logger.debug("NLTK resources warmed up")
+        except Exception as e:
+            logger.error(f"Error warming up NLTK resources: {e}")
+    
+    def load_faqs(self, path=FAQS_PATH):
+        """Stream and validate FAQs from a JSON, JSON Lines or CSV file into columnar storage."""
+        try:
+            return faq_store.load(path)
         except Exception as e:
             logger.error(f"Error loading FAQs: {e}")
             raise
@@ -91,82 +203,374 @@ class NLTKProcessor:
     def preprocess_text(self, text):
         """Preprocess text by tokenizing, removing stopwords, and lemmatizing."""
         try:
-            # Convert to lowercase
-            text = text.lower()
-            
-            # Use simple split instead of word_tokenize to avoid punkt_tab issues
-            tokens = text.split()
-            
-            # Remove punctuation and non-alphabetic tokens
-            tokens = [re.sub(r'[^\w]', '', token) for token in tokens]
-            tokens = [token for token in tokens if token.isalpha()]
-            
-            # Remove stopwords
-            stop_words = set(stopwords.words('english'))
-            tokens = [token for token in tokens if token not in stop_words]
-            
-            # Lemmatize tokens
-            tokens = [self.lemmatizer.lemmatize(token) for token in tokens]
-            
-            return tokens
+            # Simple split instead of word_tokenize avoids punkt_tab issues
+            return self.normalizer.normalize(text)
         except Exception as e:
             logger.error(f"Error preprocessing text: {e}")
             return text.lower().split()  # Fallback to simple tokenization
     
-    def find_best_match(self, query, threshold=0.3):
-        """Find the best matching FAQ for a given query."""
+    def preprocess_texts(self, texts):
+        """Preprocess a batch of texts in one pass over the shared normalizer."""
         try:
-            # Vectorize the query
-            query_vector = self.vectorizer.transform([query])
-            
-            # Calculate cosine similarity between query and all questions
-            similarities = cosine_similarity(query_vector, self.question_vectors).flatten()
+            return self.normalizer.normalize_batch(texts)
+        except Exception as e:
+            logger.error(f"Error preprocessing texts: {e}")
+            return [text.lower().split() for text in texts]
+    
+    @staticmethod
+    def _partition(snapshot, category):
+        """Return the partition to score for a category filter, or None for the whole corpus."""
+        if not category:
+            return None
+        partition = snapshot.partition(category)
+        if partition is None:
+            logger.debug(f"No FAQs in category {category!r}, scoring the whole corpus")
+        return partition
+    
+    def compute_scores(self, queries, top_k=3, query_vectors=None, snapshot=None, partition=None):
+        """Score queries against every FAQ, or one category partition, with the configured backend.
+        
+        With a partition, columns follow partition.rows rather than corpus rows.
+        """
+        snapshot = snapshot or self._snapshot
+        scores = None
+        if self.retriever != 'dense':
+            if query_vectors is None:
+                query_vectors = snapshot.tfidf_index.vectorizer.transform(queries)
+            if partition is not None:
+                question_vectors_t = partition.question_vectors_t
+            else:
+                question_vectors_t = snapshot.tfidf_index.question_vectors_t
+            scores = score_queries(query_vectors, question_vectors_t)
+        
+        dense = snapshot.dense_index
+        if dense is not None:
+            # Queries are encoded together in batches by the local model
+            rows = partition.rows if partition is not None else None
+            dense_scores = dense.score_matrix(dense.encode(queries), top_k, rows)
+            if scores is None:
+                scores = dense_scores.astype(np.float64)
+            else:
+                scores = fuse_scores(scores, dense_scores, self.dense_weight)
+        
+        return scores
+    
+    def retrieve(self, query, top_k=3, threshold=0.3, context_threshold=0.2, category=None):
+        """Vectorize and score a query once, returning best match and top-k together.
+        
+        With a category, only that category's partition is scored; scores
+        then covers the partition while top_ids stay corpus row ids.
+        """
+        start = time.perf_counter()
+        snapshot = self._snapshot
+        try:
+            partition = self._partition(snapshot, category)
+            rows = partition.rows if partition is not None else None
+            
+            # Vectorize the query once; the vector is also handed back to callers
+            query_vector = snapshot.tfidf_index.vectorizer.transform([query])
+            
+            n_scope = len(rows) if rows is not None else len(snapshot.faqs)
+            if self.retriever == 'tfidf' and n_scope >= PRUNED_SCORING_MIN_DOCUMENTS:
+                # Only FAQs sharing a term with the query are ever scored
+                inverted = partition.inverted_index if partition is not None else snapshot.tfidf_index.inverted_index
+                candidates, candidate_scores = inverted.top_k(query_vector, max(top_k, 1))
+                similarities = None
+            else:
+                # Calculate similarity between the query and all questions in scope
+                similarities = self.compute_scores(
+                    [query], top_k, query_vectors=query_vector, snapshot=snapshot, partition=partition
+                )[0]
+                candidates = top_k_indices(similarities, max(top_k, 1))
+                candidate_scores = similarities[candidates]
             
             # Find the most similar question
-            best_match_idx = similarities.argmax()
-            best_match_score = similarities[best_match_idx]
-            
-            # Check if the best match is above the threshold
-            if best_match_score >= threshold:
-                return self.faqs[best_match_idx], best_match_score
-            else:
-                return None, best_match_score
+            best_match_idx = similarities.argmax() if similarities is not None else candidates[0]
+            best_match_score = similarities[best_match_idx] if similarities is not None else candidate_scores[0]
+            best_row = rows[best_match_idx] if rows is not None else best_match_idx
+            best_match = snapshot.faqs[best_row] if best_match_score >= threshold else None
+            
+            # Keep the top k matches, filtering those below the context threshold
+            kept = [
+                (idx, score) for idx, score in zip(candidates[:top_k], candidate_scores[:top_k])
+                if score >= context_threshold
+            ]
+            top_rows = [int(rows[idx]) if rows is not None else int(idx) for idx, _ in kept]
+            top_matches = [(snapshot.faqs[row], score) for row, (_, score) in zip(top_rows, kept)]
+            
+            return RetrievalResult(
+                query=query,
+                best_match=best_match,
+                best_score=best_match_score,
+                top_matches=top_matches,
+                top_ids=top_rows,
+                query_vector=query_vector,
+                unknown_terms=snapshot.tfidf_index.unknown_terms(query),
+                scores=similarities if similarities is not None else np.zeros(0),
+                elapsed_ms=(time.perf_counter() - start) * 1000
+            )
         except Exception as e:
-            logger.error(f"Error finding best match: {e}")
-            return None, 0.0
+            logger.error(f"Error retrieving matches: {e}")
+            return RetrievalResult(query=query, elapsed_ms=(time.perf_counter() - start) * 1000)
+    
+    def find_best_match(self, query, threshold=0.3, category=None):
+        """Find the best matching FAQ for a given query."""
+        result = self.retrieve(query, threshold=threshold, category=category)
+        return result.best_match, result.best_score
     
-    def find_top_matches(self, query, top_k=3, threshold=0.2):
+    def find_top_matches(self, query, top_k=3, threshold=0.2, category=None):
         """Find top k matching FAQs for a given query."""
+        result = self.retrieve(query, top_k=top_k, context_threshold=threshold, category=category)
+        return result.top_matches
+    
+    def find_best_matches_batch(self, queries, top_k=3, threshold=0.3, context_threshold=0.2, chunk_size=1024,
+                                category=None):
+        """Match many queries at once with one transform and one sparse product per chunk."""
+        queries = list(queries)
+        results = []
+        snapshot = self._snapshot
         try:
-            # Vectorize the query
-            query_vector = self.vectorizer.transform([query])
-            
-            # Calculate cosine similarity between query and all questions
-            similarities = cosine_similarity(query_vector, self.question_vectors).flatten()
-            
-            # Get indices of top k matches
-            top_indices = similarities.argsort()[-top_k:][::-1]
+            faqs = snapshot.faqs
+            partition = self._partition(snapshot, category)
+            n_faqs = len(partition.rows) if partition is not None else len(faqs)
             
-            # Filter matches below threshold
-            top_matches = [
-                (self.faqs[idx], similarities[idx])
-                for idx in top_indices
-                if similarities[idx] >= threshold
-            ]
+            # Cap each dense score block so large corpora don't blow up memory
+            chunk_size = max(1, min(chunk_size, MAX_BATCH_SCORES // max(n_faqs, 1)))
             
-            return top_matches
+            for offset in range(0, len(queries), chunk_size):
+                start = time.perf_counter()
+                chunk = queries[offset:offset + chunk_size]
+                
+                # Vectorize and score the whole chunk with one matrix-matrix product
+                similarities = self.compute_scores(chunk, top_k, snapshot=snapshot, partition=partition)
+                
+                # Select best and top-k matches for every row in vectorized form
+                rows = np.arange(len(chunk))
+                best_indices = similarities.argmax(axis=1)
+                best_scores = similarities[rows, best_indices]
+                top_indices = top_k_indices_batch(similarities, top_k)
+                top_scores = np.take_along_axis(similarities, top_indices, axis=1)
+                
+                # Map partition columns back to corpus rows
+                if partition is not None:
+                    best_indices = partition.rows[best_indices]
+                    top_indices = partition.rows[top_indices]
+                
+                elapsed_ms = (time.perf_counter() - start) * 1000 / len(chunk)
+                for row, query in enumerate(chunk):
+                    best_score = best_scores[row]
+                    kept = top_scores[row] >= context_threshold
+                    results.append(RetrievalResult(
+                        query=query,
+                        best_match=faqs[best_indices[row]] if best_score >= threshold else None,
+                        best_score=best_score,
+                        top_matches=[
+                            (faqs[idx], score)
+                            for idx, score in zip(top_indices[row][kept], top_scores[row][kept])
+                        ],
+                        top_ids=[int(idx) for idx in top_indices[row][kept]],
+                        elapsed_ms=elapsed_ms
+                    ))
+            
+            return results
         except Exception as e:
-            logger.error(f"Error finding top matches: {e}")
-            return []
+            logger.error(f"Error finding batch matches: {e}")
+            # Pad out whatever was not scored so results stay aligned with queries
+            return results + [RetrievalResult(query=query) for query in queries[len(results):]]
+    
+    def apply_changes(self, upserts=(), deletes=()):
+        """Insert or overwrite FAQs by question and delete others, without a refit.
+        
+        Only new questions are vectorized, against the current vocabulary and
+        IDF weights; every other matrix row is copied, and category partitions
+        are rebuilt only for categories whose FAQs changed. Rows stay in
+        order, but a delete shifts the row ids after it. The patched snapshot
+        is swapped in atomically and a background refit is scheduled to
+        correct the IDF drift.
+        """
+        upserts = {faq_key(faq): faq for faq in upserts}
+        deletes = {key.strip() for key in deletes} - set(upserts)
+        if not upserts and not deletes:
+            return self._snapshot
+        
+        start = time.perf_counter()
+        with self._write_lock:
+            snapshot = self._snapshot
+            store = snapshot.faqs
+            existing = store.rows_for_questions(set(upserts) | deletes)
+            
+            # Drop deleted rows and any duplicates of an overwritten question
+            keep = np.ones(len(store), dtype=bool)
+            replaced = {}
+            for key, rows in existing.items():
+                if key in upserts:
+                    replaced[rows[0]] = upserts[key]
+                    keep[rows[1:]] = False
+                else:
+                    keep[rows] = False
+            kept_rows = np.flatnonzero(keep)
+            
+            # Brand new questions go at the end and are the only rows vectorized
+            added = [faq for key, faq in upserts.items() if key not in existing]
+            new_questions = [faq['question'] for faq in added]
+            source_rows = np.concatenate([kept_rows, np.full(len(added), -1)])
+            
+            # Overwritten rows keep their question, so only the store takes new content
+            is_replaced = np.isin(kept_rows, list(replaced))
+            store_rows = np.concatenate([np.where(is_replaced, -1, kept_rows), np.full(len(added), -1)])
+            new_records = [replaced[row] for row in kept_rows[is_replaced]] + added
+            faqs = store.with_rows(store_rows, new_records)
+            
+            generation = next_generation(snapshot.generation, {
+                'upserts': list(upserts.values()),
+                'deletes': sorted(deletes)
+            })
+            index = snapshot.tfidf_index.with_rows(source_rows, new_questions, generation)
+            dense = None
+            if snapshot.dense_index is not None:
+                dense = snapshot.dense_index.with_rows(source_rows, new_questions, generation)
+            
+            # Added and deleted rows shift document frequencies, so count them as stale
+            n_deleted = len(store) - len(kept_rows)
+            self._snapshot = CorpusSnapshot(
+                faqs,
+                faqs.category_rows(),
+                index,
+                dense,
+                stale_rows=snapshot.stale_rows + len(added) + n_deleted
+            ).carry_partitions(snapshot, source_rows)
+        
+        logger.info(f"Applied {len(upserts)} upserts and {len(deletes)} deletes "
+                    f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        self._ensure_refit_scheduler()
+        return self._snapshot
+    
+    def add_faq(self, question, answer, category='General'):
+        """Add an FAQ, or overwrite the one with the same question."""
+        return self.apply_changes(upserts=[{'category': category, 'question': question, 'answer': answer}])
+    
+    def update_faq(self, question, answer=None, category=None, new_question=None):
+        """Change the answer, category or question text of an existing FAQ."""
+        store = self._snapshot.faqs
+        rows = store.rows_for_questions([question]).get(question.strip())
+        if not rows:
+            raise KeyError(f"No FAQ with question: {question}")
+        current = store[rows[0]]
+        
+        updated = dict(current)
+        if answer is not None:
+            updated['answer'] = answer
+        if category is not None:
+            updated['category'] = category
+        if new_question is not None:
+            updated['question'] = new_question
+        
+        # A new question text is a different key, so it replaces the old entry
+        deletes = [question] if faq_key(updated) != faq_key(current) else []
+        return self.apply_changes(upserts=[updated], deletes=deletes)
+    
+    def delete_faq(self, question):
+        """Delete the FAQ with the given question."""
+        return self.apply_changes(deletes=[question])
+    
+    def reload_faqs(self, path=FAQS_PATH):
+        """Re-read the FAQ file and apply only what changed since the current snapshot."""
+        diff = diff_faqs(self._snapshot.faqs, self.load_faqs(path))
+        if not diff.is_empty:
+            self.apply_changes(upserts=diff.upserts, deletes=diff.deleted)
+        logger.info(f"Reloaded {path}: {diff.summary()}")
+        return diff
+    
+    def refit(self):
+        """Refit TF-IDF over the current FAQs and swap it in if nothing changed meanwhile."""
+        with self._refit_lock:
+            snapshot = self._snapshot
+            start = time.perf_counter()
+            generation = next_generation(snapshot.generation, {'refit': len(snapshot.faqs)})
+            index = tfidf_index.TfidfIndex.fit(snapshot.faqs.iter_questions(), self.preprocess_text, generation)
+            
+            with self._write_lock:
+                if self._snapshot is not snapshot:
+                    # An update landed during the fit; the next cycle picks it up
+                    logger.info("Corpus changed during TF-IDF refit, deferring swap")
+                    return False
+                self._snapshot = CorpusSnapshot(
+                    snapshot.faqs,
+                    snapshot.category_rows,
+                    index,
+                    snapshot.dense_index
+                )
+            
+            logger.info(f"Refitted TF-IDF over {len(snapshot.faqs)} questions "
+                        f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return True
+    
+    def _ensure_refit_scheduler(self):
+        """Start the background refit loop the first time the corpus is patched."""
+        if self._refit_thread is not None or self.refit_interval <= 0:
+            return
+        with self._write_lock:
+            if self._refit_thread is None:
+                self._refit_thread = threading.Thread(target=self._refit_loop, name='tfidf-refit', daemon=True)
+                self._refit_thread.start()
+    
+    def _refit_loop(self):
+        """Periodically refit while patched rows are scored with stale IDF weights."""
+        while not self._refit_stop.wait(self.refit_interval):
+            if self._snapshot.stale_rows:
+                try:
+                    self.refit()
+                except Exception as e:
+                    logger.error(f"Error refitting TF-IDF index: {e}")
+    
+    def stop_refit_scheduler(self):
+        """Stop the background refit loop."""
+        self._refit_stop.set()
+    
+    def shutdown(self, timeout=10.0):
+        """Stop the background refit loop and wait for it, so a retired processor holds no thread."""
+        self.stop_refit_scheduler()
+        thread, self._refit_thread = self._refit_thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+    
+    def before_fork(self, timeout=10.0):
+        """Let background threads finish so a fork copies no lock mid-use."""
+        self.stop_refit_scheduler()
+        for thread in (self._refit_thread, self._warm_up_thread):
+            if thread is not None:
+                thread.join(timeout)
+        self._refit_thread = None
+    
+    def after_fork(self):
+        """Give a forked worker fresh locks and restart the refit loop if updates are pending."""
+        self._write_lock = threading.Lock()
+        self._refit_lock = threading.Lock()
+        self._refit_thread = None
+        self._refit_stop = threading.Event()
+        if self._snapshot.stale_rows:
+            self._ensure_refit_scheduler()
+    
+    @property
+    def sia(self):
+        """The VADER analyzer, loaded on first use."""
+        return self.sentiment.analyzer
     
     def get_sentiment(self, text):
         """Analyze sentiment of text."""
         try:
-            sentiment_scores = self.sia.polarity_scores(text)
-            return sentiment_scores
+            return self.sentiment.polarity_scores(text)
         except Exception as e:
             logger.error(f"Error analyzing sentiment: {e}")
-            return {'compound': 0.0, 'pos': 0.0, 'neg': 0.0, 'neu': 1.0}
+            return dict(NEUTRAL_SCORES)
+    
+    def get_sentiments(self, texts, processes=None):
+        """Analyze sentiment of many texts, fanning large backfills out over processes."""
+        try:
+            return self.sentiment.polarity_scores_batch(texts, processes)
+        except Exception as e:
+            logger.error(f"Error analyzing sentiment: {e}")
+            return [dict(NEUTRAL_SCORES) for _ in texts]
     
     def get_categories(self):
         """Return unique categories from FAQs."""
@@ -179,8 +583,9 @@ class NLTKProcessor:
     def get_questions_by_category(self, category):
         """Return questions for a specific category."""
         try:
-            if category in self.faqs_by_category:
-                return [faq['question'] for faq in self.faqs_by_category[category]]
+            snapshot = self._snapshot
+            if category in snapshot.category_rows:
+                return [snapshot.faqs.question(row) for row in snapshot.category_rows[category]]
             else:
                 return []
         except Exception as e:
@@ -188,40 +593,28 @@ class NLTKProcessor:
             return []
 
     def extract_keywords(self, text, top_n=5):
-        """Extract top keywords from text based on TF-IDF."""
+        """Extract top keywords from text, weighted by the FAQ corpus IDF."""
         try:
-            # Preprocess the text
             preprocessed_tokens = self.preprocess_text(text)
             
             # If less than 2 tokens, return them all
             if len(preprocessed_tokens) < 2:
                 return preprocessed_tokens
             
-            # Create a small corpus with the text
-            corpus = [text]
-            
-            # Create a new vectorizer for this text
-            keyword_vectorizer = TfidfVectorizer(
-                tokenizer=self.preprocess_text,
-                stop_words='english'
-            )
-            
-            # Generate TF-IDF matrix
-            tfidf_matrix = keyword_vectorizer.fit_transform(corpus)
-            
-            # Get feature names (words)
-            feature_names = keyword_vectorizer.get_feature_names_out()
-            
-            # Get TF-IDF scores
-            scores = tfidf_matrix.toarray().flatten()
-            
-            # Create a dictionary of words and their TF-IDF scores
-            word_scores = {feature_names[i]: scores[i] for i in range(len(feature_names))}
-            
-            # Sort words by score and get top n
-            top_keywords = sorted(word_scores.items(), key=lambda x: x[1], reverse=True)[:top_n]
-            
-            return [keyword for keyword, score in top_keywords]
+            return self._snapshot.tfidf_index.keywords(preprocessed_tokens, top_n)
         except Exception as e:
             logger.error(f"Error extracting keywords: {e}")
             return []
+    
+    def extract_keywords_batch(self, texts, top_n=5):
+        """Extract top keywords for many texts, e.g. when tagging logged conversations."""
+        try:
+            # One snapshot and one normalizer pass for the whole batch
+            tfidf = self._snapshot.tfidf_index
+            return [
+                tokens if len(tokens) < 2 else tfidf.keywords(tokens, top_n)
+                for tokens in self.preprocess_texts(texts)
+            ]
+        except Exception as e:
+            logger.error(f"Error extracting keywords: {e}")
+            return [[] for _ in texts]
@@ -0,0 +1,195 @@
+import os
+import re
+import logging
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Tokens of FAQ context allowed in one RAG prompt, on top of the system prompt and question
+DEFAULT_CONTEXT_TOKENS = int(os.environ.get('RAG_CONTEXT_TOKENS', '600'))
+
+# Answers whose word sets overlap at least this much repeat an already included FAQ
+DEFAULT_DUPLICATE_OVERLAP = float(os.environ.get('RAG_DUPLICATE_OVERLAP', '0.8'))
+
+NO_MATCHES_TEXT = "No specific FAQ matches found for this query."
+
+# Rough tokenizer used when tiktoken is not installed; BPE vocabularies split
+# text into about one token per word or punctuation mark, or per 4 characters
+_ESTIMATE_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WORD_PATTERN = re.compile(r"\w+")
+
+TOKEN_CACHE_SIZE = 10000
+
+def _load_encoding(model):
+    """Return the tiktoken encoding for a model, or None if it cannot be loaded.
+
+    tiktoken downloads its BPE files on first use, so offline or behind a
+    proxy loading fails with a network error rather than ImportError.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken not installed, estimating prompt token counts")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('o200k_base')
+    except Exception as e:
+        logger.warning(f"Could not load the tiktoken encoding for {model}, estimating prompt token counts: {e}")
+        return None
+
+class TokenCounter:
+    """Counts prompt tokens locally, exactly with tiktoken or by estimate without it."""
+
+    def __init__(self, model, cache_size=TOKEN_CACHE_SIZE):
+        """Load the model's encoding on first use; FAQ blocks repeat, so counts are memoized."""
+        self.model = model
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    @property
+    def exact(self):
+        """Whether counts come from the model's real tokenizer."""
+        return self._get_encoding() is not None
+
+    def _get_encoding(self):
+        """Return the encoding, importing tiktoken on first use."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._encoding = _load_encoding(self.model)
+                    self._loaded = True
+        return self._encoding
+
+    def _count(self, text):
+        """Return the number of tokens in text."""
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text))
+        return max(len(_ESTIMATE_PATTERN.findall(text)), (len(text) + 3) // 4)
+
+@dataclass
+class PromptPlan:
+    """Messages for one RAG completion and what went into them."""
+
+    messages: list
+    prompt_tokens: int
+    included: list = field(default_factory=list)
+    duplicates: int = 0
+    over_budget: int = 0
+
+class PromptBuilder:
+    """Assembles RAG prompts, packing the best FAQs into a fixed token budget.
+
+    FAQs are taken in score order; one whose answer largely repeats an
+    answer already included is skipped, as is one that no longer fits the
+    remaining budget. The system message never changes, so it is built and
+    counted once and stays a byte-identical prefix for provider-side prompt
+    caching.
+    """
+
+    def __init__(self, system_prompt, model, context_tokens=DEFAULT_CONTEXT_TOKENS,
+                 duplicate_overlap=DEFAULT_DUPLICATE_OVERLAP):
+        """Configure the constant system prompt and the context budget."""
+        self.system_message = {"role": "system", "content": system_prompt}
+        self.context_tokens = context_tokens
+        self.duplicate_overlap = duplicate_overlap
+        self.tokens = TokenCounter(model)
+        self._system_tokens = None
+        self._lock = threading.Lock()
+        self._built = 0
+        self._prompt_tokens = 0
+        self._duplicates = 0
+        self._over_budget = 0
+
+    @property
+    def system_tokens(self):
+        """Token count of the system message, counted once."""
+        if self._system_tokens is None:
+            self._system_tokens = self.tokens.count(self.system_message['content'])
+        return self._system_tokens
+
+    @staticmethod
+    def format_faq(position, faq):
+        """Format one FAQ as a numbered context block."""
+        return f"FAQ {position}:\nQuestion: {faq['question']}\nAnswer: {faq['answer']}\nCategory: {faq['category']}"
+
+    def _is_duplicate(self, words, included_words):
+        """Whether an answer's words mostly overlap an already included answer."""
+        for other in included_words:
+            union = len(words | other)
+            if union and len(words & other) / union >= self.duplicate_overlap:
+                return True
+        return False
+
+    def pack(self, top_matches):
+        """Choose FAQs by score until the context budget is spent.
+
+        Returns the included (faq, score) pairs, their formatted blocks, and
+        how many were skipped as duplicates or for lack of budget.
+        """
+        included, blocks, included_words = [], [], []
+        duplicates = over_budget = 0
+        remaining = self.context_tokens
+
+        for faq, score in sorted(top_matches, key=lambda match: match[1], reverse=True):
+            words = frozenset(_WORD_PATTERN.findall(faq['answer'].lower()))
+            if self._is_duplicate(words, included_words):
+                duplicates += 1
+                continue
+
+            block = self.format_faq(len(included) + 1, faq)
+            # Blocks are joined by a blank line, which costs about one token
+            cost = self.tokens.count(block) + (1 if blocks else 0)
+            if cost > remaining:
+                over_budget += 1
+                continue
+
+            remaining -= cost
+            included.append((faq, score))
+            blocks.append(block)
+            included_words.append(words)
+        return included, blocks, duplicates, over_budget
+
+    def build(self, text, top_matches):
+        """Return the PromptPlan for a question and its scored FAQs."""
+        included, blocks, duplicates, over_budget = self.pack(top_matches)
+        formatted_faqs = "\n\n".join(blocks) if blocks else NO_MATCHES_TEXT
+        user_content = f"Based on these relevant FAQs:\n\n{formatted_faqs}\n\nPlease answer this question: {text}"
+
+        prompt_tokens = self.system_tokens + self.tokens.count(user_content)
+        with self._lock:
+            self._built += 1
+            self._prompt_tokens += prompt_tokens
+            self._duplicates += duplicates
+            self._over_budget += over_budget
+        if duplicates or over_budget:
+            logger.debug(f"Prompt packed {len(included)} FAQs, skipped {duplicates} duplicates "
+                         f"and {over_budget} over budget")
+
+        return PromptPlan(
+            messages=[self.system_message, {"role": "user", "content": user_content}],
+            prompt_tokens=prompt_tokens,
+            included=included,
+            duplicates=duplicates,
+            over_budget=over_budget
+        )
+
+    def stats(self):
+        """Return prompt size and FAQ skip counters."""
+        with self._lock:
+            return {
+                'prompts': self._built,
+                'mean_prompt_tokens': self._prompt_tokens / self._built if self._built else 0.0,
+                'duplicates_skipped': self._duplicates,
+                'over_budget_skipped': self._over_budget,
+                'exact_token_counts': self.tokens.exact,
+            }
@@ -0,0 +1,310 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Start a second, hedged LLM attempt if the first has not answered after this
+# many milliseconds; 0 disables hedging
+DEFAULT_HEDGE_AFTER_MS = float(os.environ.get('LLM_HEDGE_AFTER_MS', '0'))
+
+# Attempts per request, counting hedges and retries after fast failures
+DEFAULT_MAX_ATTEMPTS = int(os.environ.get('LLM_MAX_ATTEMPTS', '2'))
+
+# The breaker opens once this share of the last BREAKER_WINDOW calls failed,
+# and lets one probe call through after BREAKER_COOLDOWN seconds
+DEFAULT_BREAKER_FAILURE_RATE = float(os.environ.get('LLM_BREAKER_FAILURE_RATE', '0.5'))
+DEFAULT_BREAKER_WINDOW = int(os.environ.get('LLM_BREAKER_WINDOW', '20'))
+DEFAULT_BREAKER_MIN_CALLS = int(os.environ.get('LLM_BREAKER_MIN_CALLS', '5'))
+DEFAULT_BREAKER_COOLDOWN = float(os.environ.get('LLM_BREAKER_COOLDOWN', '30'))
+
+# A half-open probe that reports no outcome within this many seconds is
+# presumed lost, and the next caller probes instead
+DEFAULT_BREAKER_PROBE_TIMEOUT = float(os.environ.get('LLM_BREAKER_PROBE_TIMEOUT', '60'))
+
+class DeadlineExceeded(TimeoutError):
+    """No attempt answered before the request deadline."""
+
+class CircuitOpen(RuntimeError):
+    """The circuit breaker is skipping calls to a failing dependency."""
+
+class Deadline:
+    """A point in time by which a request must be answered."""
+
+    def __init__(self, seconds=None, clock=time.monotonic):
+        """Start a deadline seconds from now; None never expires."""
+        self.clock = clock
+        self.expires_at = None if seconds is None else clock() + seconds
+
+    def remaining(self):
+        """Seconds left, never negative, or None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self):
+        """Whether the deadline has passed."""
+        return self.expires_at is not None and self.clock() >= self.expires_at
+
+class CircuitBreaker:
+    """Skips a dependency while its recent failure rate is too high.
+
+    Closed: every call goes through and its outcome is recorded in a
+    rolling window. Open: calls are refused until the cooldown passes.
+    Half-open: one probe call goes through; success closes the breaker,
+    failure opens it again. A probe that never reports back, e.g. a stream
+    its client dropped, stops blocking other callers after probe_timeout.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_rate=DEFAULT_BREAKER_FAILURE_RATE, window=DEFAULT_BREAKER_WINDOW,
+                 min_calls=DEFAULT_BREAKER_MIN_CALLS, cooldown=DEFAULT_BREAKER_COOLDOWN,
+                 probe_timeout=DEFAULT_BREAKER_PROBE_TIMEOUT, clock=time.monotonic):
+        """Configure the trip threshold, window size, cooldown and probe timeout."""
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self.clock = clock
+        self._outcomes = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._probing = False
+        self._probe_started = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self):
+        """Current state, moving from open to half-open once the cooldown has passed."""
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        """Return the state; the caller holds the lock."""
+        if self._state == self.OPEN and self.clock() - self._opened_at >= self.cooldown:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self):
+        """Whether a call may go through now; in half-open, only the first caller probes."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN:
+                if self._probing and self.clock() - self._probe_started >= self.probe_timeout:
+                    logger.warning(f"Circuit breaker probe reported nothing for {self.probe_timeout}s, probing again")
+                    self._probing = False
+                if not self._probing:
+                    self._probing = True
+                    self._probe_started = self.clock()
+                    return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """End an allowed call that has no outcome, e.g. one its caller abandoned.
+
+        A half-open breaker lets the next caller probe; otherwise nothing is
+        recorded.
+        """
+        with self._lock:
+            if self._current_state() == self.HALF_OPEN:
+                self._probing = False
+
+    def record_success(self):
+        """Record a successful call, closing a half-open breaker."""
+        with self._lock:
+            if self._current_state() == self.HALF_OPEN:
+                logger.info("Circuit breaker probe succeeded, closing")
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        """Record a failed call, opening the breaker if failures dominate the window."""
+        with self._lock:
+            state = self._current_state()
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if state == self.HALF_OPEN or (
+                    len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                if state != self.OPEN:
+                    self.trips += 1
+                    logger.warning(f"Circuit breaker opening after {failures} of {len(self._outcomes)} calls failed")
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+
+    def stats(self):
+        """Return the state, recent failure rate and rejection counters."""
+        with self._lock:
+            outcomes = list(self._outcomes)
+            return {
+                'state': self._current_state(),
+                'recent_calls': len(outcomes),
+                'recent_failure_rate': outcomes.count(False) / len(outcomes) if outcomes else 0.0,
+                'rejected': self.rejected,
+                'trips': self.trips,
+            }
+
+class ResilientCaller:
+    """Runs upstream calls under a deadline with optional hedging and a circuit breaker.
+
+    func receives the seconds left before the deadline, to pass on as its
+    own request timeout. A second attempt starts when the first is slower
+    than hedge_after_ms, or straight away when it fails fast; the first
+    successful attempt wins. Attempts still running at the deadline are
+    abandoned, not interrupted.
+    """
+
+    def __init__(self, breaker=None, hedge_after_ms=DEFAULT_HEDGE_AFTER_MS, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 executor=None):
+        """Share one breaker and worker pool across requests."""
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge_after_ms = hedge_after_ms
+        self.max_attempts = max(1, max_attempts)
+        self.executor = executor or ThreadPoolExecutor(thread_name_prefix='llm-attempt')
+        self._lock = threading.Lock()
+        self.extra_attempts = 0
+        self.deadline_misses = 0
+
+    def _next_wait(self, deadline, started, attempts):
+        """Seconds to wait for in-flight attempts before hedging or giving up."""
+        remaining = deadline.remaining()
+        if self.hedge_after_ms > 0 and attempts < self.max_attempts:
+            hedge_in = max(0.0, started + self.hedge_after_ms / 1000.0 - time.monotonic())
+            return hedge_in if remaining is None else min(hedge_in, remaining)
+        return remaining
+
+    def _count_extra_attempt(self):
+        """Count an attempt beyond the first."""
+        with self._lock:
+            self.extra_attempts += 1
+
+    def _count_deadline_miss(self):
+        """Count a request that ran out of time."""
+        with self._lock:
+            self.deadline_misses += 1
+
+    def call(self, func, timeout=None):
+        """Return the first successful func(remaining_seconds) within timeout seconds.
+
+        Raises CircuitOpen without calling func while the breaker is open,
+        DeadlineExceeded when time runs out, or the last attempt's error.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpen("LLM circuit breaker is open")
+
+        deadline = Deadline(timeout)
+        pending = set()
+        attempts = 0
+        last_error = None
+        started = time.monotonic()
+        try:
+            while True:
+                if attempts < self.max_attempts and not deadline.expired() and (not pending or self.hedge_after_ms > 0):
+                    if attempts:
+                        self._count_extra_attempt()
+                    pending.add(self.executor.submit(func, deadline.remaining()))
+                    attempts += 1
+                    started = time.monotonic()
+
+                if not pending:
+                    if last_error is None:
+                        self._count_deadline_miss()
+                        raise DeadlineExceeded(f"No time left for an LLM call within {timeout}s")
+                    break
+                done, pending = wait(pending, timeout=self._next_wait(deadline, started, attempts), return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"LLM attempt failed: {e}")
+                    else:
+                        self.breaker.record_success()
+                        return result
+
+                if deadline.expired():
+                    self._count_deadline_miss()
+                    raise DeadlineExceeded(f"No LLM answer within {timeout}s")
+                if not pending and attempts >= self.max_attempts:
+                    break
+        except DeadlineExceeded:
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_failure()
+        raise last_error
+
+    async def call_async(self, func, timeout=None):
+        """Asyncio counterpart of call for coroutine functions."""
+        if not self.breaker.allow():
+            raise CircuitOpen("LLM circuit breaker is open")
+
+        deadline = Deadline(timeout)
+        pending = set()
+        attempts = 0
+        last_error = None
+        started = time.monotonic()
+        try:
+            while True:
+                if attempts < self.max_attempts and not deadline.expired() and (not pending or self.hedge_after_ms > 0):
+                    if attempts:
+                        self._count_extra_attempt()
+                    pending.add(asyncio.ensure_future(func(deadline.remaining())))
+                    attempts += 1
+                    started = time.monotonic()
+
+                if not pending:
+                    if last_error is None:
+                        self._count_deadline_miss()
+                        raise DeadlineExceeded(f"No time left for an LLM call within {timeout}s")
+                    break
+                done, pending = await asyncio.wait(pending, timeout=self._next_wait(deadline, started, attempts),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        logger.warning(f"LLM attempt failed: {last_error}")
+                    else:
+                        self.breaker.record_success()
+                        return task.result()
+
+                if deadline.expired():
+                    self._count_deadline_miss()
+                    raise DeadlineExceeded(f"No LLM answer within {timeout}s")
+                if not pending and attempts >= self.max_attempts:
+                    break
+        except DeadlineExceeded:
+            self.breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            # The caller went away, which says nothing about the dependency
+            self.breaker.release()
+            raise
+        finally:
+            # Unlike threads, leftover tasks can be cancelled
+            for task in pending:
+                task.cancel()
+
+        self.breaker.record_failure()
+        raise last_error
+
+    def stats(self):
+        """Return hedging, deadline and breaker counters."""
+        with self._lock:
+            counters = {'extra_attempts': self.extra_attempts, 'deadline_misses': self.deadline_misses}
+        counters['breaker'] = self.breaker.stats()
+        return counters
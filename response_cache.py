@@ -0,0 +1,124 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+DEFAULT_TTL_SECONDS = float(os.environ.get('RESPONSE_CACHE_TTL', '3600'))
+
+# Rough per-entry bookkeeping cost on top of the key and answer text
+ENTRY_OVERHEAD_BYTES = 256
+
+class ResponseCache:
+    """Thread-safe LRU cache of final answers with TTL expiry and a byte budget."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        """Create an empty cache bounded by total size and entry age."""
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.generation = None
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(tokens, category=None):
+        """Build a cache key from normalized query tokens and the selected category."""
+        if not tokens:
+            # Stopword-only messages normalize to nothing and must not share an entry
+            return None
+        return tuple(tokens), category
+
+    @staticmethod
+    def _entry_size(key, value):
+        """Estimate the memory held by one cache entry."""
+        tokens, category = key
+        size = ENTRY_OVERHEAD_BYTES + sum(len(token) for token in tokens) + len(category or '')
+        for part in value:
+            if isinstance(part, str):
+                size += len(part.encode('utf-8'))
+        return size
+
+    def _check_generation(self, generation):
+        """Drop every entry if the FAQ corpus changed since they were stored."""
+        if generation != self.generation:
+            if self._entries:
+                logger.info("FAQ corpus changed, invalidating response cache")
+            self._entries.clear()
+            self.current_bytes = 0
+            self.generation = generation
+
+    def get(self, key, generation=None):
+        """Return the cached value for a key, or None on a miss."""
+        if key is None:
+            return None
+
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.current_bytes -= size
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation=None):
+        """Store a value, evicting least recently used entries to fit the budget."""
+        if key is None:
+            return
+
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._check_generation(generation)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+
+            self._entries[key] = (value, size, self.clock() + self.ttl)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self):
+        """Remove every cached entry."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,81 @@
+from dataclasses import dataclass, field
+from typing import Optional
+import numpy as np
+
+@dataclass
+class RetrievalResult:
+    """Outcome of scoring one query against the FAQ corpus in a single pass."""
+
+    query: str
+    best_match: Optional[dict] = None
+    best_score: float = 0.0
+    top_matches: list = field(default_factory=list)
+    top_ids: list = field(default_factory=list)
+    query_vector: object = None
+    # Query tokens outside the FAQ vocabulary, which query_vector cannot represent
+    unknown_terms: frozenset = frozenset()
+    # Scores for every FAQ in scope; empty when inverted-index pruning skipped them
+    scores: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    elapsed_ms: float = 0.0
+
+    @property
+    def is_confident(self):
+        """Whether the best hit cleared the direct-answer threshold."""
+        return self.best_match is not None
+
+def score_queries(query_vectors, question_vectors_t):
+    """Return cosine scores of query rows against every FAQ question.
+
+    Both operands come out of the TF-IDF vectorizer already L2-normalized, so
+    a sparse dot product against the term-major matrix equals cosine
+    similarity without re-normalizing on every call.
+    """
+    return (query_vectors @ question_vectors_t).toarray()
+
+def fuse_scores(lexical_scores, dense_scores, dense_weight=0.5):
+    """Blend lexical TF-IDF and dense embedding cosine scores into one ranking score."""
+    # Dense cosine can dip below zero for unrelated text; treat that as no signal
+    dense_scores = np.clip(dense_scores, 0.0, None)
+    return (1.0 - dense_weight) * lexical_scores + dense_weight * dense_scores
+
+def top_k_indices(scores, k):
+    """Return indices of the k highest scores, best first, via partial selection.
+
+    Equal scores rank the lower index first, as argmax and InvertedIndex.top_k do.
+    """
+    n = scores.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+
+    # O(n) selection of the k-th largest; ties at that score keep the lowest indices
+    kth = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > kth)
+    tied = np.flatnonzero(scores == kth)[:k - len(above)]
+    candidates = np.concatenate([above, tied])
+    # Both runs are in index order, so a stable sort by score breaks ties by index
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+def top_k_indices_batch(scores, k):
+    """Return per-row indices of the k highest scores, best first, ties to the lower index."""
+    n_rows, n = scores.shape
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros((n_rows, 0), dtype=np.intp)
+
+    # Partial selection along each row, then sort only the k survivors by score, then index
+    if k < n:
+        candidates = np.argpartition(scores, n - k, axis=1)[:, n - k:]
+    else:
+        candidates = np.tile(np.arange(n), (n_rows, 1))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.lexsort((candidates, -candidate_scores), axis=1)
+    top = np.take_along_axis(candidates, order, axis=1)
+
+    # Where a tie straddles the k-th place, argpartition may keep any of the tied indices
+    kth = candidate_scores.min(axis=1)
+    n_tied = (scores == kth[:, None]).sum(axis=1)
+    straddling = np.flatnonzero(n_tied > (candidate_scores == kth[:, None]).sum(axis=1))
+    for row in straddling:
+        top[row] = top_k_indices(scores[row], k)
+    return top
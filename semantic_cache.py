@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import secrets
+from collections import OrderedDict
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+DEFAULT_RADIUS = float(os.environ.get('SEMANTIC_CACHE_RADIUS', '0.9'))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('SEMANTIC_CACHE_MAX_ENTRIES', '10000'))
+DEFAULT_TTL_SECONDS = float(os.environ.get('SEMANTIC_CACHE_TTL', '86400'))
+
+# Paraphrases of one question collapse into few entries, so buckets stay small
+MAX_ENTRIES_PER_BUCKET = 32
+
+class CachedAnswer:
+    """One stored LLM answer with the normalized query vector that produced it."""
+
+    __slots__ = ('entry_id', 'bucket', 'indices', 'weights', 'answer', 'created_at')
+
+    def __init__(self, entry_id, bucket, indices, weights, answer, created_at):
+        """Hold the pieces needed to match and replay a cached answer."""
+        self.entry_id = entry_id
+        self.bucket = bucket
+        self.indices = indices
+        self.weights = weights
+        self.answer = answer
+        self.created_at = created_at
+
+    def cosine(self, indices, weights):
+        """Return the dot product with another L2-normalized sparse vector."""
+        _, mine, theirs = np.intersect1d(self.indices, indices, assume_unique=True, return_indices=True)
+        return float(np.dot(self.weights[mine], weights[theirs]))
+
+class SQLiteBackend:
+    """Local persistent store for semantic cache entries."""
+
+    def __init__(self, path):
+        """Open (or create) the cache database at path."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        with self._lock, self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_cache ("
+                "entry_id INTEGER PRIMARY KEY, generation TEXT, bucket TEXT, "
+                "indices BLOB, weights BLOB, answer TEXT, created_at REAL)"
+            )
+
+    def _connection(self):
+        """Return the open connection, connecting first if needed; the caller holds the lock."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        return self._conn
+
+    def close(self):
+        """Close the connection; the next operation opens a new one."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def after_fork(self):
+        """Forget any connection inherited from the parent, which SQLite forbids using after fork."""
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def load(self, generation):
+        """Yield every stored entry belonging to a corpus generation, oldest first."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT entry_id, bucket, indices, weights, answer, created_at "
+                "FROM semantic_cache WHERE generation = ? ORDER BY created_at",
+                (generation,)
+            ).fetchall()
+        for entry_id, bucket, indices, weights, answer, created_at in rows:
+            bucket = json.loads(bucket)
+            if len(bucket) != 2 or not all(isinstance(part, list) for part in bucket):
+                # Written before buckets carried unknown terms; it could match the wrong question
+                continue
+            yield CachedAnswer(
+                entry_id,
+                (tuple(bucket[0]), tuple(bucket[1])),
+                np.frombuffer(indices, dtype=np.int64),
+                np.frombuffer(weights, dtype=np.float64),
+                answer,
+                created_at
+            )
+
+    def save(self, generation, entry):
+        """Persist one entry."""
+        with self._lock, self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO semantic_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (entry.entry_id, generation, json.dumps(entry.bucket),
+                 entry.indices.astype(np.int64).tobytes(), entry.weights.astype(np.float64).tobytes(),
+                 entry.answer, entry.created_at)
+            )
+
+    def delete(self, entry_id):
+        """Remove one entry."""
+        with self._lock, self._connection() as conn:
+            conn.execute("DELETE FROM semantic_cache WHERE entry_id = ?", (entry_id,))
+
+    def delete_expired(self, cutoff):
+        """Remove entries of every generation created at or before cutoff."""
+        with self._lock, self._connection() as conn:
+            conn.execute("DELETE FROM semantic_cache WHERE created_at <= ?", (cutoff,))
+
+class SemanticCache:
+    """Second-level cache that reuses LLM answers for near-duplicate queries.
+
+    Entries are bucketed by the set of FAQs retrieved for the prompt, since
+    that set fully determines the grounding context, and by the query's
+    unknown terms, the tokens no FAQ uses. The TF-IDF vector cannot see
+    those, so "ship to Canada" and "ship to Brazil" have the same vector
+    and must not share an answer. Within a bucket, a query hits when its
+    TF-IDF vector lies within a cosine radius of a stored one.
+    """
+
+    def __init__(self, radius=DEFAULT_RADIUS, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl=DEFAULT_TTL_SECONDS, backend=None, clock=time.time):
+        """Create an empty cache, optionally backed by a persistent store."""
+        self.radius = radius
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self.clock = clock
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_entry_id():
+        """Return a random 63-bit entry id.
+
+        Workers sharing one SQLite file each insert entries, so ids must not
+        depend on per-process state; 63 bits fit SQLite's INTEGER PRIMARY KEY.
+        """
+        return secrets.randbits(63)
+
+    @staticmethod
+    def make_bucket(faq_ids, unknown_terms=()):
+        """Return the bucket key for a set of retrieved FAQ ids and the query's unknown terms."""
+        return tuple(sorted(int(faq_id) for faq_id in faq_ids)), tuple(sorted(unknown_terms))
+
+    @staticmethod
+    def _vector_parts(query_vector):
+        """Return (indices, weights) of a 1 x V sparse row, or None if it is empty."""
+        if query_vector is None or query_vector.nnz == 0:
+            return None
+        row = query_vector.tocsr()
+        order = np.argsort(row.indices)
+        return row.indices[order].astype(np.int64), row.data[order].astype(np.float64)
+
+    def _check_generation(self, generation):
+        """Swap to a new corpus generation, reloading persisted entries for it."""
+        if generation == self.generation:
+            return
+
+        self._entries.clear()
+        self._buckets.clear()
+        self.generation = generation
+
+        if self.backend is not None:
+            try:
+                # Workers sharing the file may still serve an older generation,
+                # so other generations' entries are left to expire, not deleted
+                self.backend.delete_expired(self.clock() - self.ttl)
+                for entry in self.backend.load(generation):
+                    self._insert(entry, persist=False)
+                logger.info(f"Loaded {len(self._entries)} semantic cache entries from backend")
+            except Exception as e:
+                logger.error(f"Error loading semantic cache backend: {e}")
+
+    def _persist(self, operation, *args):
+        """Apply a backend operation without letting backend failures escape."""
+        try:
+            operation(*args)
+        except Exception as e:
+            # A failing backend must not take the in-memory cache down with it
+            logger.error(f"Error updating semantic cache backend: {e}")
+
+    def _remove(self, entry, persist=True):
+        """Drop an entry from memory and, optionally, from the backend."""
+        self._entries.pop(entry.entry_id, None)
+        bucket_entries = self._buckets.get(entry.bucket)
+        if bucket_entries is not None:
+            bucket_entries.remove(entry)
+            if not bucket_entries:
+                del self._buckets[entry.bucket]
+        if persist and self.backend is not None:
+            self._persist(self.backend.delete, entry.entry_id)
+
+    def _insert(self, entry, persist=True):
+        """Add an entry, evicting the least recently used ones past the bounds."""
+        bucket_entries = self._buckets.setdefault(entry.bucket, [])
+        if len(bucket_entries) >= MAX_ENTRIES_PER_BUCKET:
+            self._remove(bucket_entries[0], persist)
+            self.evictions += 1
+            bucket_entries = self._buckets.setdefault(entry.bucket, [])
+
+        bucket_entries.append(entry)
+        self._entries[entry.entry_id] = entry
+        if persist and self.backend is not None:
+            self._persist(self.backend.save, self.generation, entry)
+
+        while len(self._entries) > self.max_entries:
+            _, oldest = next(iter(self._entries.items()))
+            self._remove(oldest, persist)
+            self.evictions += 1
+
+    def get(self, faq_ids, query_vector, generation=None, unknown_terms=()):
+        """Return a cached answer for a paraphrase of an earlier query, or None.
+
+        unknown_terms, the query tokens outside the FAQ vocabulary, must
+        match the stored query's exactly.
+        """
+        parts = self._vector_parts(query_vector)
+        if parts is None:
+            return None
+        indices, weights = parts
+        bucket = self.make_bucket(faq_ids, unknown_terms)
+
+        with self._lock:
+            self._check_generation(generation)
+            now = self.clock()
+
+            best, best_similarity = None, self.radius
+            for entry in list(self._buckets.get(bucket, ())):
+                if entry.created_at + self.ttl <= now:
+                    self._remove(entry)
+                    continue
+                similarity = entry.cosine(indices, weights)
+                if similarity >= best_similarity:
+                    best, best_similarity = entry, similarity
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best.entry_id)
+            self.hits += 1
+            logger.debug(f"Semantic cache hit with similarity {best_similarity:.3f}")
+            return best.answer
+
+    def put(self, faq_ids, query_vector, answer, generation=None, unknown_terms=()):
+        """Store an LLM answer for the retrieved FAQ set, query vector and unknown terms."""
+        parts = self._vector_parts(query_vector)
+        if parts is None:
+            return
+        indices, weights = parts
+
+        with self._lock:
+            self._check_generation(generation)
+            bucket = self.make_bucket(faq_ids, unknown_terms)
+            entry = CachedAnswer(self.new_entry_id(), bucket, indices, weights, answer, self.clock())
+            self._insert(entry)
+
+    def before_fork(self):
+        """Close the backend connection so no forked worker inherits it."""
+        if self.backend is not None:
+            self.backend.close()
+
+    def after_fork(self):
+        """Give a forked worker its own lock and backend connection."""
+        self._lock = threading.Lock()
+        if self.backend is not None:
+            self.backend.after_fork()
+
+    def stats(self):
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'buckets': len(self._buckets),
+            }
+
+def from_environment():
+    """Build a semantic cache, persisted to SEMANTIC_CACHE_PATH if it is set."""
+    path = os.environ.get('SEMANTIC_CACHE_PATH')
+    backend = None
+    if path:
+        try:
+            backend = SQLiteBackend(path)
+        except Exception as e:
+            logger.error(f"Error opening semantic cache backend at {path}: {e}")
+    return SemanticCache(backend=backend)
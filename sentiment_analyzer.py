@@ -0,0 +1,139 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = int(os.environ.get('SENTIMENT_CACHE_SIZE', '10000'))
+
+# Batches with at least this many uncached texts fan out over a process pool
+PROCESS_POOL_MIN_TEXTS = int(os.environ.get('SENTIMENT_POOL_MIN_TEXTS', '5000'))
+POOL_CHUNK_SIZE = 1000
+
+NEUTRAL_SCORES = {'neg': 0.0, 'neu': 1.0, 'pos': 0.0, 'compound': 0.0}
+
+def normalize(text):
+    """Return the memo key for a text.
+
+    VADER reads capitalization and punctuation as intensity, so only runs of
+    whitespace are collapsed; it splits on whitespace, so scores are unchanged.
+    """
+    return ' '.join(text.split())
+
+def _load_analyzer():
+    """Construct VADER, loading its lexicon."""
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+# Per-process analyzer for pool workers, loaded once by the initializer
+_worker_analyzer = None
+
+def _init_worker():
+    """Load the lexicon once per pool worker."""
+    global _worker_analyzer
+    _worker_analyzer = _load_analyzer()
+
+def _score_chunk(texts):
+    """Score a chunk of normalized texts in a pool worker."""
+    return [_worker_analyzer.polarity_scores(text) for text in texts]
+
+class SentimentAnalyzer:
+    """VADER polarity scoring with a lazily loaded lexicon and a bounded memo cache."""
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        """Defer loading VADER until the first text is scored."""
+        self.cache_size = cache_size
+        self._analyzer = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def analyzer(self):
+        """The underlying SentimentIntensityAnalyzer, loaded on first use."""
+        if self._analyzer is None:
+            with self._lock:
+                if self._analyzer is None:
+                    logger.debug("Loading VADER sentiment lexicon")
+                    self._analyzer = _load_analyzer()
+        return self._analyzer
+
+    def _lookup(self, key):
+        """Return cached scores for a normalized text, or None."""
+        with self._lock:
+            scores = self._cache.get(key)
+            if scores is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return scores
+
+    def _store(self, key, scores):
+        """Remember the scores of a normalized text, evicting the least recently used."""
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = scores
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def polarity_scores(self, text):
+        """Return VADER scores for one text, served from the cache when seen before."""
+        key = normalize(text)
+        scores = self._lookup(key)
+        if scores is None:
+            scores = self.analyzer.polarity_scores(key)
+            self._store(key, scores)
+        # Hand out copies so callers cannot corrupt cached entries
+        return dict(scores)
+
+    def polarity_scores_batch(self, texts, processes=None):
+        """Return VADER scores for many texts, scoring each distinct text once.
+
+        Large batches of uncached texts are split across a process pool of
+        `processes` workers (default: one per CPU); processes=1 keeps
+        everything in this process.
+        """
+        keys = [normalize(text) for text in texts]
+        known = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            scores = self._lookup(key)
+            if scores is None:
+                missing.append(key)
+            else:
+                known[key] = scores
+
+        if missing:
+            for key, scores in zip(missing, self._score_missing(missing, processes)):
+                known[key] = scores
+                self._store(key, scores)
+        return [dict(known[key]) for key in keys]
+
+    def _score_missing(self, texts, processes):
+        """Score uncached texts, in a process pool when the batch is large enough."""
+        if processes == 1 or len(texts) < PROCESS_POOL_MIN_TEXTS:
+            analyzer = self.analyzer
+            return [analyzer.polarity_scores(text) for text in texts]
+
+        chunks = [texts[i:i + POOL_CHUNK_SIZE] for i in range(0, len(texts), POOL_CHUNK_SIZE)]
+        logger.info(f"Scoring sentiment of {len(texts)} texts across a process pool")
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+            return [scores for chunk in pool.map(_score_chunk, chunks) for scores in chunk]
+
+    def stats(self):
+        """Return memo cache hit/miss counts and size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache)}
+
+    def clear_cache(self):
+        """Drop all memoized scores."""
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,191 @@
+import os
+import logging
+import threading
+from chatbot_service import ChatbotService
+from faq_store import DEFAULT_FAQ_PATH
+from latency_metrics import startup_profile
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+class ServiceRegistry:
+    """Process-wide, lazily built holder for a shared ChatbotService instance.
+
+    Streamlit re-executes the app script on every interaction, but imported
+    modules stay cached in the process, so a registry living at module level is
+    built once and then reused by every session and rerun.
+    """
+
+    def __init__(self, factory=ChatbotService, corpus_path=DEFAULT_FAQ_PATH):
+        """Initialize an empty registry around a service factory."""
+        self.factory = factory
+        self.corpus_path = corpus_path
+        self._service = None
+        self._corpus_stamp = None
+        # Stamp of a corpus file that failed to load, not retried until it changes again
+        self._failed_stamp = None
+        self._build_lock = threading.Lock()
+        self._reload_lock = threading.RLock()
+        self._watcher = None
+        self._watcher_stop = threading.Event()
+
+    def _read_corpus_stamp(self):
+        """Return a cheap fingerprint of the FAQ corpus file."""
+        try:
+            stat = os.stat(self.corpus_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def get(self):
+        """Return the shared service, building it on first access."""
+        service = self._service
+        if service is not None:
+            return service
+
+        with self._build_lock:
+            # Another thread may have finished the build while we waited
+            if self._service is None:
+                stamp = self._read_corpus_stamp()
+                self._service = self.factory()
+                self._corpus_stamp = stamp
+                startup_profile.mark_ready()
+                logger.info(f"Built shared ChatbotService instance. {startup_profile.format()}")
+            return self._service
+
+    def warm_up(self):
+        """Build the service and prime its retrieval path ahead of real traffic."""
+        service = self.get()
+        try:
+            service.nltk_processor.find_best_match("warm up")
+            # Pay for importing the OpenAI client before the first LLM call
+            service.openai_client
+            logger.info("Shared ChatbotService warmed up")
+        except Exception as e:
+            logger.error(f"Error warming up ChatbotService: {e}")
+        return service
+
+    def reload(self):
+        """Build a fresh service and swap it in without blocking readers."""
+        with self._reload_lock:
+            stamp = self._read_corpus_stamp()
+
+            # Build outside the read path so in-flight requests keep the old instance
+            new_service = self.factory()
+
+            with self._build_lock:
+                old_service, self._service = self._service, new_service
+                self._corpus_stamp = stamp
+                self._failed_stamp = None
+
+            logger.info("Swapped in reloaded ChatbotService instance")
+            # In-flight requests may still read the old instance, but its refit thread must not outlive it
+            if old_service is not None:
+                old_service.shutdown()
+            return new_service
+
+    def apply_corpus_diff(self):
+        """Patch the live service with only the FAQs that changed on disk.
+        
+        If the file cannot be applied, its stamp is remembered so the watcher
+        waits for the next change instead of retrying the same broken file.
+        """
+        with self._reload_lock:
+            service = self.get()
+            stamp = self._read_corpus_stamp()
+            try:
+                diff = service.nltk_processor.reload_faqs(self.corpus_path)
+            except Exception:
+                self._failed_stamp = stamp
+                raise
+            self._corpus_stamp = stamp
+            self._failed_stamp = None
+            return diff
+
+    def refresh_if_changed(self):
+        """Apply the FAQ corpus diff if the file changed since it was last read."""
+        if self._service is None:
+            return self.get()
+
+        stamp = self._read_corpus_stamp()
+        if stamp is None or stamp in (self._corpus_stamp, self._failed_stamp):
+            return self._service
+
+        with self._reload_lock:
+            # A concurrent caller may already have picked up or failed on this change
+            if self._read_corpus_stamp() not in (self._corpus_stamp, self._failed_stamp):
+                logger.info(f"Detected change in {self.corpus_path}, applying diff")
+                try:
+                    self.apply_corpus_diff()
+                except Exception as e:
+                    # Keep serving the current corpus until the file changes again
+                    logger.error(f"Error applying FAQ corpus diff, keeping the current FAQs: {e}")
+        return self._service
+
+    def start_watcher(self, interval=5.0):
+        """Poll the FAQ file in a daemon thread and apply changes as they appear."""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def watch():
+            while not self._watcher_stop.wait(interval):
+                self.refresh_if_changed()
+
+        self._watcher_stop.clear()
+        self._watcher = threading.Thread(target=watch, name='faq-watcher', daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching {self.corpus_path} for changes every {interval:g}s")
+
+    def stop_watcher(self, timeout=10.0):
+        """Stop the FAQ file watcher, waiting for a refresh in progress to finish."""
+        self._watcher_stop.set()
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None and watcher is not threading.current_thread():
+            watcher.join(timeout)
+
+    def loaded(self):
+        """Return the shared service if it has been built, without building it."""
+        return self._service
+
+    def before_fork(self):
+        """Quiesce background threads in a pre-fork master; threads do not survive fork."""
+        self.stop_watcher()
+        service = self._service
+        if service is not None:
+            service.before_fork()
+
+    def after_fork(self, watch_interval=0):
+        """Reset locks, connections and background threads in a freshly forked worker."""
+        self._build_lock = threading.Lock()
+        self._reload_lock = threading.RLock()
+        service = self._service
+        if service is not None:
+            service.after_fork()
+        self.start_watcher(watch_interval)
+
+    def clear(self):
+        """Drop the shared instance so the next access rebuilds it."""
+        with self._build_lock:
+            self._service = None
+            self._corpus_stamp = None
+            self._failed_stamp = None
+
+# Default registry shared by every caller in this process
+registry = ServiceRegistry()
+
+def get_chatbot_service():
+    """Return the process-wide ChatbotService."""
+    return registry.get()
+
+def warm_up():
+    """Build and prime the process-wide ChatbotService."""
+    return registry.warm_up()
+
+def reload_chatbot_service():
+    """Hot-swap the process-wide ChatbotService with a freshly built one."""
+    return registry.reload()
+
+def reload_faqs():
+    """Apply the FAQ file diff to the process-wide ChatbotService."""
+    return registry.apply_corpus_diff()
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+class _Call:
+    """One in-flight upstream call and the outcome its waiters share."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _FlightStats:
+    """Counters shared by the thread and asyncio single-flight groups."""
+
+    def __init__(self):
+        self.calls = 0
+        self.collapsed = 0
+
+    def stats(self, in_flight):
+        """Return how many requests ran upstream and how many shared another's call."""
+        requests = self.calls + self.collapsed
+        return {
+            'requests': requests,
+            'upstream_calls': self.calls,
+            'collapsed': self.collapsed,
+            'collapse_rate': self.collapsed / requests if requests else 0.0,
+            'in_flight': in_flight,
+        }
+
+class SingleFlight(_FlightStats):
+    """Collapses concurrent calls with the same key into one, for threaded callers.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs block until it finishes and receive the same result or exception.
+    Nothing is remembered after the call completes, so this caps fan-out
+    without acting as a cache.
+    """
+
+    def __init__(self):
+        """Start with no calls in flight."""
+        super().__init__()
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, timeout=None):
+        """Return func() for key, sharing one execution among concurrent callers.
+
+        Followers wait at most timeout seconds and then raise TimeoutError;
+        the leader's call is not interrupted.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.collapsed += 1
+
+        if leader:
+            try:
+                call.result = func()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(timeout):
+            raise TimeoutError(f"Timed out waiting for an in-flight call after {timeout}s")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        """Return call and collapse counters."""
+        with self._lock:
+            return super().stats(len(self._calls))
+
+class AsyncSingleFlight(_FlightStats):
+    """Collapses concurrent awaits with the same key into one, within an event loop."""
+
+    def __init__(self):
+        """Start with no calls in flight."""
+        super().__init__()
+        self._tasks = {}
+
+    async def do(self, key, func):
+        """Return await func() for key, sharing one execution among concurrent awaiters.
+
+        The call runs in its own task, which every awaiter waits on through a
+        shield, so cancelling any caller, the first included, only stops
+        that caller waiting.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            self.calls += 1
+            task = self._tasks[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        """Forget a completed call so the next request for key runs afresh."""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark a failure retrieved, since every awaiter may have been cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        """Return call and collapse counters."""
+        return super().stats(len(self._tasks))
@@ -170,6 +170,41 @@ document.addEventListener('DOMContentLoaded', function() {
         return messageDiv;
     }
     
+    // Add an empty bot message that is filled in as response chunks arrive
+    function addStreamingMessage(source = '') {
+        const messageDiv = document.createElement('div');
+        messageDiv.classList.add('message', 'bot');
+        
+        const messageContent = document.createElement('div');
+        messageContent.classList.add('message-content');
+        const paragraph = document.createElement('p');
+        messageContent.appendChild(paragraph);
+        
+        // Add source badge
+        const sourceBadge = document.createElement('span');
+        sourceBadge.classList.add('badge', 'bg-secondary', 'source-badge');
+        sourceBadge.textContent = source;
+        messageDiv.appendChild(sourceBadge);
+        
+        messageDiv.appendChild(messageContent);
+        messagesContainer.appendChild(messageDiv);
+        scrollToBottom();
+        
+        const entry = { text: '', isUser: false, source: source };
+        conversationHistory.push(entry);
+        
+        return {
+            append(chunk) {
+                paragraph.textContent += chunk;
+                entry.text += chunk;
+                scrollToBottom();
+            },
+            finish() {
+                paragraph.style.borderRight = 'none';
+            }
+        };
+    }
+    
     // Show typing indicator
     function showTypingIndicator() {
         typingIndicator.classList.remove('d-none');
@@ -274,8 +309,8 @@ document.addEventListener('DOMContentLoaded', function() {
             addAuroraTransitionEffect();
         }
         
-        // Send message to server
-        fetch('/api/chat', {
+        // Stream the answer from the server and render chunks as they arrive
+        fetch('/api/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -285,17 +320,38 @@ document.addEventListener('DOMContentLoaded', function() {
                 use_rag: useRAG
             })
         })
-        .then(response => response.json())
-        .then(data => {
-            // Hide typing indicator
-            hideTypingIndicator();
+        .then(async response => {
+            if (!response.ok || !response.body) {
+                const data = await response.json().catch(() => ({}));
+                throw new Error(data.error || `HTTP ${response.status}`);
+            }
+            
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let message = null;
+            
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                
+                const chunk = decoder.decode(value, { stream: true });
+                if (!chunk) continue;
+                
+                // Swap the typing indicator for the message on the first chunk
+                if (!message) {
+                    hideTypingIndicator();
+                    message = addStreamingMessage(response.headers.get('X-Response-Source') || 'unknown');
+                }
+                message.append(chunk);
+            }
             
-            // Add bot response to chat
-            if (data.error) {
-                addMessage(`Error: ${data.error}`, false, 'error');
-            } else {
-                addMessage(data.response, false, data.source || 'unknown');
+            const tail = decoder.decode();
+            if (!message) {
+                hideTypingIndicator();
+                message = addStreamingMessage(response.headers.get('X-Response-Source') || 'unknown');
             }
+            if (tail) message.append(tail);
+            message.finish();
         })
         .catch(error => {
             // Hide typing indicator
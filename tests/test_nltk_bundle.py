@@ -0,0 +1,27 @@
+import os
+import zipfile
+import nltk
+import nltk_bundle
+
+def make_nltk_data(root):
+    """Install stopwords zipped and the other packages unzipped, as nltk.download leaves them."""
+    os.makedirs(root / 'corpora')
+    with zipfile.ZipFile(root / 'corpora' / 'stopwords.zip', 'w') as archive:
+        archive.writestr('stopwords/', '')
+        archive.writestr('stopwords/english', 'a\nthe\n')
+    for resource, member in [('corpora/wordnet', 'lexnames'), ('sentiment/vader_lexicon', 'vader_lexicon.txt')]:
+        os.makedirs(root / resource)
+        (root / resource / member).write_text('data\n')
+
+def test_build_bundles_zipped_and_unzipped_installs(tmp_path, monkeypatch):
+    make_nltk_data(tmp_path / 'nltk_data')
+    monkeypatch.setattr(nltk.data, 'path', [str(tmp_path / 'nltk_data')])
+    monkeypatch.setattr(nltk, 'download', lambda *args, **kwargs: False)
+
+    bundle_dir = str(tmp_path / 'bundle')
+    nltk_bundle.build(bundle_dir)
+
+    nltk_bundle.verify(bundle_dir)
+    assert nltk_bundle.stopwords(bundle_dir=bundle_dir) == ['a', 'the']
+    assert nltk_bundle.read_member('wordnet', 'wordnet/lexnames', bundle_dir) == 'data\n'
+    assert nltk_bundle.read_member('vader_lexicon', 'vader_lexicon/vader_lexicon.txt', bundle_dir) == 'data\n'
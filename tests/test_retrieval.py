@@ -0,0 +1,48 @@
+import numpy as np
+from faq_corpus import CorpusSnapshot
+from retrieval import score_queries, top_k_indices, top_k_indices_batch
+from tfidf_index import TfidfIndex
+
+def make_corpus(n_docs, seed=0):
+    """Short questions over a small vocabulary, with every third one duplicated so scores tie."""
+    rng = np.random.default_rng(seed)
+    vocab = [f"w{i}" for i in range(60)]
+    docs = [" ".join(rng.choice(vocab, size=rng.integers(2, 6))) for _ in range(n_docs)]
+    return [docs[i - 1] if i % 3 == 2 else doc for i, doc in enumerate(docs)]
+
+def make_snapshot(n_docs=600):
+    """A snapshot over make_corpus, split into three interleaved categories."""
+    index = TfidfIndex.fit(make_corpus(n_docs), str.split)
+    rows = np.arange(n_docs)
+    category_rows = {f"c{c}": rows[rows % 3 == c] for c in range(3)}
+    return CorpusSnapshot(faqs=None, category_rows=category_rows, tfidf_index=index)
+
+def scopes(snapshot):
+    """Yield (term-major matrix, inverted index) for the whole corpus and each category."""
+    yield snapshot.tfidf_index.question_vectors_t, snapshot.tfidf_index.inverted_index
+    for category in sorted(snapshot.categories):
+        partition = snapshot.partition(category)
+        yield partition.question_vectors_t, partition.inverted_index
+
+def test_top_k_indices_breaks_ties_by_lower_index():
+    scores = np.array([0.5, 0.9, 0.5, 0.9, 0.1, 0.5])
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 0]
+    assert top_k_indices(scores, 4).tolist() == [1, 3, 0, 2]
+    assert top_k_indices_batch(np.vstack([scores, scores[::-1]]), 4).tolist() == [[1, 3, 0, 2], [2, 4, 0, 3]]
+
+def test_pruned_top_k_matches_exhaustive_scoring():
+    snapshot = make_snapshot()
+    queries = make_corpus(200, seed=1) + ["", "unknown words only"]
+    query_vectors = snapshot.tfidf_index.vectorizer.transform(queries)
+
+    for question_vectors_t, inverted in scopes(snapshot):
+        scores = score_queries(query_vectors, question_vectors_t)
+        batch_ids = top_k_indices_batch(scores, 5)
+        for i in range(len(queries)):
+            for k in (1, 3, 5):
+                ids = top_k_indices(scores[i], k)
+                pruned_ids, pruned_scores = inverted.top_k(query_vectors[i], k)
+                assert pruned_ids.tolist() == ids.tolist()
+                assert pruned_scores.tolist() == scores[i][ids].tolist()
+            assert batch_ids[i].tolist() == top_k_indices(scores[i], 5).tolist()
+            assert ids[0] == scores[i].argmax()
@@ -0,0 +1,71 @@
+import numpy as np
+from semantic_cache import SemanticCache, SQLiteBackend
+from tfidf_index import TfidfIndex
+
+QUESTIONS = [
+    "Can I pay with PayPal?",
+    "Which payment methods do you accept?",
+    "Do you ship internationally?",
+    "How long does shipping take?",
+]
+
+def fit_index():
+    """Fit a small TF-IDF index with a plain whitespace tokenizer."""
+    return TfidfIndex.fit(QUESTIONS, lambda text: text.replace('?', '').split())
+
+def lookup(cache, index, text, faq_ids, generation='g'):
+    """Look a question up the way the chatbot services do."""
+    return cache.get(faq_ids, index.vectorizer.transform([text]), generation, index.unknown_terms(text))
+
+def store(cache, index, text, faq_ids, answer, generation='g'):
+    """Store an answer the way the chatbot services do."""
+    cache.put(faq_ids, index.vectorizer.transform([text]), answer, generation, index.unknown_terms(text))
+
+def test_unknown_terms_are_tokens_outside_the_vocabulary():
+    index = fit_index()
+    assert index.unknown_terms("Can I pay with bitcoin?") == {'bitcoin'}
+    assert index.unknown_terms("Can I pay with PayPal?") == frozenset()
+
+def test_questions_differing_only_in_unknown_terms_do_not_share_answers():
+    index = fit_index()
+    cache = SemanticCache()
+
+    store(cache, index, "Do you ship to Canada?", [2], "Yes, we ship to Canada.")
+    # Neither country is in the FAQ vocabulary, so both vectors are identical
+    canada = index.vectorizer.transform(["Do you ship to Canada?"])
+    brazil = index.vectorizer.transform(["Do you ship to Brazil?"])
+    assert (canada != brazil).nnz == 0
+    assert lookup(cache, index, "Do you ship to Brazil?", [2]) is None
+    assert lookup(cache, index, "do you ship to canada", [2]) == "Yes, we ship to Canada."
+
+    store(cache, index, "Can I pay with PayPal?", [0], "Yes, PayPal is accepted.")
+    assert lookup(cache, index, "Can I pay with bitcoin?", [0]) is None
+    assert lookup(cache, index, "Can I pay with PayPal", [0]) == "Yes, PayPal is accepted."
+
+def test_unknown_terms_survive_the_sqlite_backend(tmp_path):
+    index = fit_index()
+    path = str(tmp_path / 'cache.db')
+    store(SemanticCache(backend=SQLiteBackend(path)), index, "Do you ship to Canada?", [2], "Canada")
+
+    reloaded = SemanticCache(backend=SQLiteBackend(path))
+    assert lookup(reloaded, index, "Do you ship to Brazil?", [2]) is None
+    assert lookup(reloaded, index, "Do you ship to Canada?", [2]) == "Canada"
+
+def test_switching_generation_keeps_other_workers_entries(tmp_path):
+    index = fit_index()
+    path = str(tmp_path / 'cache.db')
+    now = [1000.0]
+    old_worker = SemanticCache(backend=SQLiteBackend(path), clock=lambda: now[0], ttl=100)
+    new_worker = SemanticCache(backend=SQLiteBackend(path), clock=lambda: now[0], ttl=100)
+
+    store(old_worker, index, "Do you ship to Canada?", [2], "old", generation='g1')
+    store(new_worker, index, "Do you ship to Canada?", [2], "new", generation='g2')
+
+    # A worker still on g1 reloading from the file keeps its entries
+    assert lookup(SemanticCache(backend=SQLiteBackend(path), clock=lambda: now[0]),
+                  index, "Do you ship to Canada?", [2], generation='g1') == "old"
+
+    # Entries of any generation are dropped once past the TTL
+    now[0] += 101
+    assert lookup(SemanticCache(backend=SQLiteBackend(path), clock=lambda: now[0], ttl=100),
+                  index, "Do you ship to Canada?", [2], generation='g1') is None
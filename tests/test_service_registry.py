@@ -0,0 +1,20 @@
+from service_registry import ServiceRegistry
+
+class FakeService:
+    """Stands in for ChatbotService, recording whether it was shut down."""
+
+    def __init__(self):
+        self.stopped = False
+
+    def shutdown(self):
+        self.stopped = True
+
+def test_reload_shuts_down_the_replaced_service(tmp_path):
+    registry = ServiceRegistry(factory=FakeService, corpus_path=str(tmp_path / 'faqs.json'))
+    old_service = registry.get()
+
+    new_service = registry.reload()
+
+    assert registry.get() is new_service
+    assert old_service.stopped
+    assert not new_service.stopped
@@ -0,0 +1,90 @@
+import re
+import logging
+import threading
+from functools import lru_cache
+import nltk_bundle
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Strips every character that is neither a word character nor whitespace,
+# which matches removing non-word characters from each whitespace token
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+
+DEFAULT_LEMMA_CACHE_SIZE = 50000
+
+class TextNormalizer:
+    """Tokenize, filter stopwords and lemmatize text with precomputed resources."""
+
+    def __init__(self, lemmatizer=None, stop_words=None, cache_size=DEFAULT_LEMMA_CACHE_SIZE):
+        """Build the stopword set and lemma cache once for all later calls.
+
+        WordNet is only loaded on the first lemma cache miss, or by warm_up.
+        """
+        self._lemmatizer = lemmatizer
+        self._lemmatizer_lock = threading.Lock()
+        if stop_words is None:
+            stop_words = self._default_stop_words()
+        self.stop_words = frozenset(stop_words)
+
+        # Vocabulary is Zipfian, so a bounded per-token cache absorbs most lookups
+        self._lemmatize = lru_cache(maxsize=cache_size)(self._lemmatize_uncached)
+
+    @staticmethod
+    def _default_stop_words():
+        """Return NLTK's English stopwords, from the offline bundle when there is one."""
+        if nltk_bundle.available():
+            return nltk_bundle.stopwords('english')
+        from nltk.corpus import stopwords
+        return stopwords.words('english')
+
+    @property
+    def lemmatizer(self):
+        """The WordNet lemmatizer, imported and constructed on first use."""
+        if self._lemmatizer is None:
+            with self._lemmatizer_lock:
+                if self._lemmatizer is None:
+                    from nltk.stem import WordNetLemmatizer
+                    self._lemmatizer = WordNetLemmatizer()
+        return self._lemmatizer
+
+    def _lemmatize_uncached(self, token):
+        """Lemmatize one token with WordNet."""
+        return self.lemmatizer.lemmatize(token)
+
+    def warm_up(self):
+        """Import nltk and load WordNet now, so no query pays for it."""
+        # WordNet itself loads lazily on the first lemmatize call
+        self.lemmatizer.lemmatize('warming')
+
+    def normalize(self, text):
+        """Return the lowercased, filtered and lemmatized tokens of a text."""
+        stop_words = self.stop_words
+        lemmatize = self._lemmatize
+        return [
+            lemmatize(token)
+            for token in NON_WORD_PATTERN.sub('', text.lower()).split()
+            if token.isalpha() and token not in stop_words
+        ]
+
+    def normalize_batch(self, texts):
+        """Normalize a list of texts, tokenizing each distinct text only once."""
+        seen = {}
+        results = []
+        for text in texts:
+            tokens = seen.get(text)
+            if tokens is None:
+                tokens = self.normalize(text)
+                seen[text] = tokens
+            # Hand out copies so callers can mutate results independently
+            results.append(list(tokens))
+        return results
+
+    def cache_info(self):
+        """Return hit/miss statistics for the lemma cache."""
+        return self._lemmatize.cache_info()
+
+    def clear_cache(self):
+        """Drop all memoized lemmas."""
+        self._lemmatize.cache_clear()
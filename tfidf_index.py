@@ -0,0 +1,323 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import heapq
+import logging
+import tempfile
+from collections import Counter
+import numpy as np
+from scipy import sparse
+from inverted_index import InvertedIndex
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Bump FORMAT_VERSION when the on-disk layout changes and TOKENIZER_VERSION
+# when preprocessing changes, so stale artifacts are never picked up
+FORMAT_VERSION = 3
+TOKENIZER_VERSION = 1
+
+DEFAULT_INDEX_DIR = os.environ.get('TFIDF_INDEX_DIR', 'index_cache')
+
+def corpus_hash(corpus_path):
+    """Return the content hash that keys index artifacts for a FAQ corpus."""
+    digest = hashlib.sha256()
+    digest.update(f"format={FORMAT_VERSION};tokenizer={TOKENIZER_VERSION};".encode('utf-8'))
+    with open(corpus_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _make_vectorizer(tokenizer):
+    """Create a vectorizer with the settings used for FAQ question matching."""
+    # scikit-learn takes over a second to import, so only fitting pays for it
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(
+        tokenizer=tokenizer,
+        stop_words='english'
+    )
+
+class QueryVectorizer:
+    """Transform-only stand-in for a fitted TfidfVectorizer, built from a saved artifact.
+
+    Reproduces TfidfVectorizer.transform for the settings of _make_vectorizer
+    (lowercase, custom tokenizer, stop words, raw counts, L2 norm) without
+    importing scikit-learn, so a worker serving a prebuilt index starts fast.
+    """
+
+    def __init__(self, tokenizer, vocabulary, idf, stop_words):
+        """Wrap the fitted vocabulary, IDF weights and stop words."""
+        self.tokenizer = tokenizer
+        self.vocabulary_ = vocabulary
+        self.idf_ = idf
+        self.stop_words_ = frozenset(stop_words)
+
+    def get_stop_words(self):
+        """Return the stop words dropped after tokenizing."""
+        return self.stop_words_
+
+    def transform(self, texts):
+        """Return the L2-normalized TF-IDF rows of texts as a CSR matrix."""
+        vocabulary = self.vocabulary_
+        stop_words = self.stop_words_
+        indices = []
+        indptr = [0]
+        for text in texts:
+            for token in self.tokenizer(text.lower()):
+                if token not in stop_words:
+                    column = vocabulary.get(token)
+                    if column is not None:
+                        indices.append(column)
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(indices)), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(indptr) - 1, len(self.idf_))
+        )
+        # Repeated terms become counts, in sorted column order like scikit-learn
+        matrix.sum_duplicates()
+        matrix.data *= self.idf_[matrix.indices]
+
+        row_lengths = np.diff(matrix.indptr)
+        norms = np.sqrt(np.bincount(np.repeat(np.arange(matrix.shape[0]), row_lengths),
+                                    weights=matrix.data ** 2, minlength=matrix.shape[0]))
+        norms[norms == 0] = 1.0
+        matrix.data /= np.repeat(norms, row_lengths)
+        return matrix
+
+def _load_csr(path, prefix, shape):
+    """Memory-map a CSR matrix saved with _save_csr."""
+    # Read-only memory maps let every worker share one page-cached copy
+    data = np.load(os.path.join(path, f'{prefix}data.npy'), mmap_mode='r')
+    indices = np.load(os.path.join(path, f'{prefix}indices.npy'), mmap_mode='r')
+    indptr = np.load(os.path.join(path, f'{prefix}indptr.npy'), mmap_mode='r')
+    return sparse.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+def _save_csr(path, prefix, matrix):
+    """Save the raw arrays of a CSR matrix as individual .npy files."""
+    np.save(os.path.join(path, f'{prefix}data.npy'), matrix.data)
+    np.save(os.path.join(path, f'{prefix}indices.npy'), matrix.indices)
+    np.save(os.path.join(path, f'{prefix}indptr.npy'), matrix.indptr)
+
+class TfidfIndex:
+    """Fitted TF-IDF vocabulary, IDF weights and FAQ question matrix."""
+
+    def __init__(self, vectorizer, question_vectors, content_hash=None, question_vectors_t=None):
+        """Wrap an already fitted vectorizer and its question matrix."""
+        self.vectorizer = vectorizer
+        self.question_vectors = question_vectors
+        self.content_hash = content_hash
+
+        # Term-major copy of the L2-normalized rows, so scoring a query only
+        # walks the rows of the terms it actually contains
+        if question_vectors_t is None:
+            question_vectors_t = question_vectors.T.tocsr()
+        self.question_vectors_t = question_vectors_t
+        self._inverted_index = None
+        self._keyword_weights = None
+
+    @property
+    def inverted_index(self):
+        """Posting-list view of the question matrix for pruned top-k, built on first use."""
+        if self._inverted_index is None:
+            self._inverted_index = InvertedIndex(self.question_vectors_t)
+        return self._inverted_index
+
+    @property
+    def keyword_weights(self):
+        """Return (term -> IDF weight, weight for terms unseen at fit time), built on first use."""
+        if self._keyword_weights is None:
+            idf = np.asarray(self.vectorizer.idf_, dtype=np.float64)
+            terms = sorted(self.vectorizer.vocabulary_, key=self.vectorizer.vocabulary_.get)
+            # Unseen terms are at least as rare as the rarest FAQ term
+            unseen = float(idf.max()) if len(idf) else 1.0
+            self._keyword_weights = (dict(zip(terms, idf.tolist())), unseen)
+        return self._keyword_weights
+
+    def keywords(self, tokens, top_n=5):
+        """Rank preprocessed tokens by term frequency times corpus IDF, best first.
+
+        Stop words are dropped as the vectorizer drops them; equal scores keep
+        the order in which the terms first appear.
+        """
+        weights, unseen = self.keyword_weights
+        stop_words = self.vectorizer.get_stop_words() or ()
+        counts = Counter(token for token in tokens if token not in stop_words)
+        scored = [(count * weights.get(term, unseen), term) for term, count in counts.items()]
+        return [term for _, term in heapq.nlargest(top_n, scored, key=lambda item: item[0])]
+
+    def unknown_terms(self, text):
+        """Return the tokens of text that the vectorizer drops because no FAQ question uses them."""
+        vocabulary = self.vectorizer.vocabulary_
+        stop_words = self.vectorizer.get_stop_words() or ()
+        return frozenset(
+            token for token in self.vectorizer.tokenizer(text.lower())
+            if token not in stop_words and token not in vocabulary
+        )
+
+    @classmethod
+    def fit(cls, questions, tokenizer, content_hash=None):
+        """Fit a new index over the given FAQ questions."""
+        vectorizer = _make_vectorizer(tokenizer)
+        question_vectors = vectorizer.fit_transform(questions).tocsr()
+        return cls(vectorizer, question_vectors, content_hash)
+
+    def with_rows(self, source_rows, new_questions, content_hash):
+        """Return a new index laid out by source_rows, without refitting.
+
+        Each entry of source_rows is either a row of this index to copy or -1
+        for the next question in new_questions, which is vectorized with the
+        current vocabulary and IDF weights. Terms unseen at fit time are
+        ignored until the next full fit.
+        """
+        source_rows = np.asarray(source_rows, dtype=np.intp)
+        fresh = source_rows < 0
+        copied = self.question_vectors[source_rows[~fresh]]
+        if fresh.any():
+            stacked = sparse.vstack([copied, self.vectorizer.transform(new_questions)]).tocsr()
+        else:
+            stacked = copied.tocsr()
+
+        # Put copied and freshly vectorized rows back in their target positions
+        order = np.empty(len(source_rows), dtype=np.intp)
+        order[~fresh] = np.arange(copied.shape[0])
+        order[fresh] = copied.shape[0] + np.arange(int(fresh.sum()))
+        index = TfidfIndex(self.vectorizer, stacked[order], content_hash)
+        # Same vocabulary and IDF weights, so the keyword table carries over
+        index._keyword_weights = self._keyword_weights
+        return index
+
+    @staticmethod
+    def artifact_path(index_dir, content_hash):
+        """Return the artifact directory for a given corpus hash."""
+        return os.path.join(index_dir, f"tfidf-{content_hash[:16]}")
+
+    def save(self, index_dir=DEFAULT_INDEX_DIR):
+        """Write the index to disk as a versioned, memory-mappable artifact."""
+        if not self.content_hash:
+            raise ValueError("Cannot persist a TF-IDF index without a corpus hash")
+
+        final_path = self.artifact_path(index_dir, self.content_hash)
+        if os.path.isdir(final_path):
+            return final_path
+
+        os.makedirs(index_dir, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix='.tfidf-', dir=index_dir)
+        try:
+            # Vocabulary terms are stored in column order
+            vocabulary = self.vectorizer.vocabulary_
+            terms = [None] * len(vocabulary)
+            for term, column in vocabulary.items():
+                terms[column] = term
+            with open(os.path.join(tmp_path, 'vocabulary.json'), 'w') as f:
+                json.dump(terms, f)
+
+            with open(os.path.join(tmp_path, 'stop_words.json'), 'w') as f:
+                json.dump(sorted(self.vectorizer.get_stop_words() or ()), f)
+
+            matrix = self.question_vectors
+            np.save(os.path.join(tmp_path, 'idf.npy'), np.asarray(self.vectorizer.idf_))
+            _save_csr(tmp_path, '', matrix)
+            _save_csr(tmp_path, 'transposed_', self.question_vectors_t)
+
+            manifest = {
+                'format_version': FORMAT_VERSION,
+                'tokenizer_version': TOKENIZER_VERSION,
+                'corpus_sha256': self.content_hash,
+                'n_documents': matrix.shape[0],
+                'n_features': matrix.shape[1],
+                'created_at': time.time(),
+            }
+            with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+
+            # Publish atomically; a concurrent writer may have beaten us to it
+            try:
+                os.rename(tmp_path, final_path)
+            except OSError:
+                if not os.path.isdir(final_path):
+                    raise
+                shutil.rmtree(tmp_path, ignore_errors=True)
+
+            logger.info(f"Saved TF-IDF index artifact to {final_path}")
+            return final_path
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, index_dir, content_hash, tokenizer):
+        """Memory-map a saved index for the given corpus hash, or return None."""
+        path = cls.artifact_path(index_dir, content_hash)
+        manifest_path = os.path.join(path, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return None
+
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if (manifest.get('format_version') != FORMAT_VERSION
+                or manifest.get('tokenizer_version') != TOKENIZER_VERSION
+                or manifest.get('corpus_sha256') != content_hash):
+            logger.info(f"Ignoring stale TF-IDF index artifact at {path}")
+            return None
+
+        with open(os.path.join(path, 'vocabulary.json'), 'r') as f:
+            terms = json.load(f)
+        with open(os.path.join(path, 'stop_words.json'), 'r') as f:
+            stop_words = json.load(f)
+
+        shape = (manifest['n_documents'], manifest['n_features'])
+        question_vectors = _load_csr(path, '', shape)
+        question_vectors_t = _load_csr(path, 'transposed_', shape[::-1])
+        idf = np.load(os.path.join(path, 'idf.npy'))
+
+        vocabulary = {term: column for column, term in enumerate(terms)}
+        vectorizer = QueryVectorizer(tokenizer, vocabulary, idf, stop_words)
+
+        logger.info(f"Memory-mapped TF-IDF index artifact from {path}")
+        return cls(vectorizer, question_vectors, content_hash, question_vectors_t)
+
+def load_or_build(corpus_path, questions, tokenizer, index_dir=DEFAULT_INDEX_DIR, persist=True):
+    """Load the index artifact for a corpus, refitting only if its hash changed."""
+    content_hash = corpus_hash(corpus_path)
+
+    try:
+        index = TfidfIndex.load(index_dir, content_hash, tokenizer)
+        if index is not None:
+            return index
+    except Exception as e:
+        logger.error(f"Error loading TF-IDF index artifact, refitting: {e}")
+
+    index = TfidfIndex.fit(questions, tokenizer, content_hash)
+    logger.info(f"Fitted TF-IDF index over {index.question_vectors.shape[0]} questions")
+
+    if persist:
+        try:
+            index.save(index_dir)
+        except Exception as e:
+            # A read-only deployment can still serve from the in-memory fit
+            logger.warning(f"Could not persist TF-IDF index artifact: {e}")
+
+    return index
+
+def main(argv=None):
+    """Build the TF-IDF index artifact offline for the current FAQ corpus."""
+    from nltk_processor import NLTKProcessor
+
+    argv = sys.argv[1:] if argv is None else argv
+    index_dir = argv[0] if argv else DEFAULT_INDEX_DIR
+
+    try:
+        processor = NLTKProcessor(index_dir=index_dir)
+        path = processor.tfidf_index.save(index_dir)
+        logger.info(f"TF-IDF index artifact ready at {path}")
+    except Exception as e:
+        logger.error(f"Error building TF-IDF index artifact: {e}")
+        raise
+
+if __name__ == "__main__":
+    main()